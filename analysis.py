@@ -0,0 +1,189 @@
+"""Image analysis - thumbnail-based brightness, dominant color and perceptual hash.
+
+Thumbnails (~64 px via iiurlwidth) are fetched in batches, decoded to a fixed
+32x32 grid and analysed with NumPy over the whole batch at once. Results are
+cached per pageid in ANALYSIS_FILE, so selection can use them for free.
+NumPy and Pillow are optional: without them analysis is simply skipped.
+"""
+
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request
+
+from config import ANALYSIS_FILE, API_URL, THUMB_WIDTH
+from core import (
+    CancelToken,
+    _API_HEADERS,
+    _check_cancel,
+    _fetch_with_retry,
+    _open_with_proxies,
+    _write_json_atomic,
+    ensure_dir,
+)
+
+_GRID = 32  # 统一缩放到 32x32 后再做批量运算
+_HASH_SIZE = 8  # pHash 取 DCT 左上 8x8 -> 64 bit
+_API_BATCH = 50  # MediaWiki 单次查询的 pageids 上限
+
+_cache_lock = threading.Lock()
+_cache = None
+
+
+def load_analysis() -> dict:
+    """{str(pageid): {"brightness", "color", "phash"}}, read from disk once per process."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                with open(ANALYSIS_FILE, encoding="utf-8") as f:
+                    data = json.load(f)
+                _cache = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                _cache = {}
+        return _cache
+
+
+def _save_analysis(entries: dict):
+    global _cache
+    with _cache_lock:
+        merged = dict(_cache or {})
+        merged.update(entries)
+        ensure_dir()
+        _write_json_atomic(ANALYSIS_FILE, merged)
+        _cache = merged
+
+
+def fetch_thumbnail_urls(pageids: list[int], width: int = THUMB_WIDTH,
+                         cancel_token: CancelToken | None = None) -> dict[int, str]:
+    """Map pageid -> thumbnail URL of about `width` px, 50 pages per API call."""
+    urls = {}
+    for i in range(0, len(pageids), _API_BATCH):
+        _check_cancel(cancel_token)
+        params = {
+            "action": "query",
+            "pageids": "|".join(str(p) for p in pageids[i:i + _API_BATCH]),
+            "prop": "imageinfo",
+            "iiprop": "url",
+            "iiurlwidth": width,
+            "format": "json",
+        }
+        req = Request(f"{API_URL}?{urlencode(params)}", headers=_API_HEADERS)
+        data = _fetch_with_retry(req, max_retries=2, cancel_token=cancel_token)
+        pages = (data or {}).get("query", {}).get("pages", {})
+        for page in pages.values():
+            info = (page.get("imageinfo") or [{}])[0]
+            if page.get("pageid") and info.get("thumburl"):
+                urls[int(page["pageid"])] = info["thumburl"]
+    return urls
+
+
+def _fetch_bytes(url: str) -> bytes | None:
+    req = Request(url, headers={"User-Agent": "DailyCommonsWallpaper/1.0"})
+    try:
+        with _open_with_proxies(req, timeout=15) as resp:
+            return resp.read()
+    except (URLError, HTTPError, OSError, ValueError):
+        return None
+
+
+def _decode_grid(data: bytes):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        return img.convert("RGB").resize((_GRID, _GRID), Image.Resampling.BILINEAR).tobytes()
+
+
+def _dct_matrix(n: int):
+    import numpy as np
+
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+def analyze_pixels(pixels):
+    """Vectorized stats for a (N, H, W, 3) uint8 batch.
+
+    Returns (brightness[N] in 0..1, dominant[N, 3] uint8, phash[N] uint64).
+    """
+    import numpy as np
+
+    rgb = pixels.astype(np.float32)
+    luma = rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)  # (N, H, W)
+    brightness = luma.mean(axis=(1, 2)) / 255.0
+
+    # 主色：每通道量化到 3 bit（512 个桶），整批一次 bincount 后逐行取众数
+    n = pixels.shape[0]
+    q = (pixels >> 5).astype(np.int64)
+    codes = (q[..., 0] << 6 | q[..., 1] << 3 | q[..., 2]).reshape(n, -1)
+    codes += (np.arange(n, dtype=np.int64) * 512)[:, None]
+    hist = np.bincount(codes.ravel(), minlength=n * 512).reshape(n, 512)
+    top = hist.argmax(axis=1)
+    dominant = (np.stack([top >> 6, (top >> 3) & 7, top & 7], axis=1) * 32 + 16).astype(np.uint8)
+
+    # pHash：二维 DCT 取低频 8x8，与中位数（不含直流分量）比较得到 64 位
+    d = _dct_matrix(luma.shape[1])
+    coeffs = (d[:_HASH_SIZE] @ luma @ d[:_HASH_SIZE].T).reshape(n, -1)
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    bits = (coeffs > median).astype(np.uint64)
+    weights = np.uint64(1) << np.arange(63, -1, -1, dtype=np.uint64)
+    phash = (bits * weights).sum(axis=1, dtype=np.uint64)
+    return brightness, dominant, phash
+
+
+def analyze_catalog(images: list[dict], cancel_token: CancelToken | None = None, batch: int = 100) -> dict:
+    """Analyse catalog entries missing from the cache; returns the whole cache.
+
+    已分析过的 pageid 不会重复下载；缺少 NumPy / Pillow 时直接返回现有缓存。
+    """
+    cache = load_analysis()
+    try:
+        import numpy as np
+        import PIL  # noqa: F401
+    except ImportError:
+        return cache
+    # 只有 Commons 条目能通过 API 取缩略图；本地目录图源的条目没有真实 pageid
+    todo = [int(im["pageid"]) for im in images
+            if im.get("pageid") and not im.get("source") and str(im["pageid"]) not in cache]
+    for i in range(0, len(todo), batch):
+        _check_cancel(cancel_token)
+        urls = fetch_thumbnail_urls(todo[i:i + batch], cancel_token=cancel_token)
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="ThumbThread") as pool:
+            blobs = dict(zip(urls, pool.map(_fetch_bytes, urls.values())))
+        ids, grids = [], []
+        for pageid, data in blobs.items():
+            if not data:
+                continue
+            try:
+                grids.append(_decode_grid(data))
+                ids.append(pageid)
+            except Exception:
+                continue
+        if not ids:
+            continue
+        pixels = np.frombuffer(b"".join(grids), dtype=np.uint8).reshape(len(ids), _GRID, _GRID, 3)
+        brightness, dominant, phash = analyze_pixels(pixels)
+        _save_analysis({
+            str(pid): {
+                "brightness": round(float(brightness[j]), 4),
+                "color": "#{:02x}{:02x}{:02x}".format(*(int(c) for c in dominant[j])),
+                "phash": f"{int(phash[j]):016x}",
+            }
+            for j, pid in enumerate(ids)
+        })
+    return load_analysis()
+
+
+def matches_theme(entry: dict | None, theme: str, dark_max: float, light_min: float) -> bool:
+    if not entry:
+        return False
+    b = entry.get("brightness")
+    if b is None:
+        return False
+    return b <= dark_max if theme == "dark" else b >= light_min
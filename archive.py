@@ -0,0 +1,192 @@
+"""Archive compaction - re-encode old wallpapers to screen-sized WebP.
+
+Past wallpapers in WALLPAPER_DIR are kept for the history, but as multi-MB
+originals. Once a day the tray re-encodes the ones older than
+"archive_after_days" (config.json, 0 disables) into ARCHIVE_DIR at screen
+resolution and removes the original; ARCHIVE_FILE maps each original file
+name to its compact copy. Encoding runs in a single low-priority process.
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from config import (
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_DIR,
+    ARCHIVE_FILE,
+    ARCHIVE_QUALITY,
+    CACHE_FILE,
+    LOCK_FILE,
+    WALLPAPER_DIR,
+)
+from core import (
+    CancelToken,
+    _check_cancel,
+    _load_prefetch,
+    _remove_quietly,
+    _write_json_atomic,
+    ensure_dir,
+    load_config,
+)
+
+_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp")
+
+
+def load_archive() -> dict:
+    try:
+        with open(ARCHIVE_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def archived_path(path: str | Path) -> Path | None:
+    """Compact copy of a wallpaper that has been archived, if any."""
+    entry = load_archive().get(Path(path).name)
+    if entry and Path(entry.get("path", "")).is_file():
+        return Path(entry["path"])
+    return None
+
+
+def _settings() -> tuple[float, int]:
+    cfg = load_config()
+    try:
+        days = float(cfg.get("archive_after_days", ARCHIVE_AFTER_DAYS))
+        quality = int(cfg.get("archive_quality") or ARCHIVE_QUALITY)
+    except (TypeError, ValueError):
+        days, quality = ARCHIVE_AFTER_DAYS, ARCHIVE_QUALITY
+    return days, max(1, min(100, quality))
+
+
+def _in_use() -> set[str]:
+    """Files that must stay as they are: the applied wallpaper and prefetched ones (all monitors)."""
+    entries = list(_load_prefetch().values())
+    try:
+        with open(CACHE_FILE, encoding="utf-8") as f:
+            entries.append(json.load(f))
+    except (OSError, ValueError):
+        pass
+    entries += [m for e in entries if isinstance(e, dict) for m in e.get("monitors") or []]
+    return {Path(e["path"]).name for e in entries if isinstance(e, dict) and e.get("path")}
+
+
+def _candidates(max_age_days: float) -> list[Path]:
+    cutoff = time.time() - max_age_days * 86400
+    in_use = _in_use()
+    archived = load_archive()
+    found = []
+    for path in WALLPAPER_DIR.glob("wallpaper_*"):
+        if path.suffix.lower() not in _EXTENSIONS or path.name in in_use or path.name in archived:
+            continue
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                found.append(path)
+        except OSError:
+            continue
+    return sorted(found)
+
+
+def _lower_process_priority():
+    # 进程池初始化函数：整个编码进程以最低优先级运行
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x40)  # IDLE_PRIORITY_CLASS
+        else:
+            os.nice(19)
+    except (OSError, AttributeError):
+        pass
+
+
+def _webp_supported() -> bool:
+    """Runs in the pool process, so the caller (the tray) never imports Pillow."""
+    from PIL import features
+
+    return bool(features.check("webp"))
+
+
+def _encode(src: str, dest: str, screen: tuple[int, int], quality: int) -> tuple[int, int]:
+    """Runs in the pool process: scale src down to cover screen and save it as WebP."""
+    from PIL import Image
+
+    part = dest + ".part"
+    with Image.open(src) as img:
+        # 不裁剪：保留完整画面，只缩小到刚好覆盖屏幕
+        scale = max(screen[0] / img.width, screen[1] / img.height)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img.draft("RGB", size)
+        img = img.convert("RGB")
+        if scale < 1:
+            img = img.resize(size, Image.Resampling.LANCZOS)
+        img.save(part, format="WEBP", quality=quality, method=6)
+        result = img.size
+    os.replace(part, dest)
+    return result
+
+
+def compact_archive(cancel_token: CancelToken | None = None) -> dict:
+    """Compact old wallpapers; returns counts and bytes saved.
+
+    编码在单进程池中进行（最多占用一个核心，优先级最低）；替换原图时短暂持有
+    更新锁并重新确认文件未被应用，正在进行的更新或轮播不会受影响。
+    """
+    from coordinator import InterProcessLock
+    from display import get_display_size
+
+    stats = {"compacted": 0, "failed": 0, "saved_bytes": 0}
+    max_age, quality = _settings()
+    if max_age <= 0:
+        return stats
+    ensure_dir()
+    candidates = _candidates(max_age)
+    if not candidates:
+        return stats
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    screen = get_display_size()
+
+    with ProcessPoolExecutor(max_workers=1, initializer=_lower_process_priority) as pool:
+        if not pool.submit(_webp_supported).result():
+            return stats
+        for src in candidates:
+            _check_cancel(cancel_token)
+            dest = ARCHIVE_DIR / (src.stem + ".webp")
+            try:
+                original_bytes = src.stat().st_size
+                width, height = pool.submit(_encode, str(src), str(dest), screen, quality).result()
+            except Exception:
+                # 损坏或 Pillow 无法解码的文件保持原样
+                _remove_quietly(dest.with_name(dest.name + ".part"))
+                stats["failed"] += 1
+                continue
+            lock = InterProcessLock(LOCK_FILE)
+            if not lock.try_acquire():
+                # 更新进行中：放弃本次，明天再试
+                _remove_quietly(dest)
+                break
+            try:
+                if src.name in _in_use():
+                    _remove_quietly(dest)
+                    continue
+                archive = load_archive()
+                archive[src.name] = {
+                    "path": str(dest),
+                    "original_bytes": original_bytes,
+                    "bytes": dest.stat().st_size,
+                    "width": width,
+                    "height": height,
+                    "archived": datetime.now().isoformat(timespec="seconds"),
+                }
+                _write_json_atomic(ARCHIVE_FILE, archive)
+                _remove_quietly(src)
+            finally:
+                lock.release()
+            stats["compacted"] += 1
+            stats["saved_bytes"] += original_bytes - archive[src.name]["bytes"]
+    return stats
@@ -15,9 +15,12 @@ a = Analysis(
     binaries=[],
     datas=[(str(ROOT / 'i18n'), 'i18n')],
     hiddenimports=[
-        'pystray._win32', 'PIL', 'PIL._tkinter_finder',
+        'pystray._win32', 'PIL', 'PIL._tkinter_finder', 'PIL.ImageTk',
         'infi.systray', 'infi.systray.win32_adapter',
         'config', 'core', 'tray', 'i18n', 'i18n.loader',
+        'analysis', 'archive', 'coordinator', 'dedupe', 'display', 'executor', 'history', 'httpcache',
+        'ipc', 'metrics', 'multimonitor', 'peer', 'profiler', 'progress', 'ranking', 'scheduler',
+        'slideshow', 'snapshot', 'sources', 'status', 'worker',
     ],
     hookspath=[],
     hooksconfig={},
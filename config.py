@@ -8,6 +8,7 @@ MIN_WIDTH = 1920
 MIN_HEIGHT = 1080
 CATEGORY = "Commons featured widescreen desktop backgrounds"
 API_URL = "https://commons.wikimedia.org/w/api.php"
+UPLOAD_HOST = "upload.wikimedia.org"  # Commons 原图所在主机
 _DATE_HASH_PRIME = 2654435761
 
 # Paths
@@ -15,9 +16,92 @@ WALLPAPER_DIR = Path.home() / ".daily_commons_wallpaper"
 CACHE_FILE = WALLPAPER_DIR / "cache.json"
 CONFIG_FILE = WALLPAPER_DIR / "config.json"
 ICON_FILE = WALLPAPER_DIR / "tray_icon.ico"
+LOCK_FILE = WALLPAPER_DIR / "update.lock"
+SWAP_LOCK_FILE = WALLPAPER_DIR / "swap.lock"  # 渐进式应用：原图下载与替换进行中
+PREFETCH_FILE = WALLPAPER_DIR / "prefetch.json"
+INSTANCE_FILE = WALLPAPER_DIR / "instance.json"
+INSTANCE_LOCK_FILE = WALLPAPER_DIR / "instance.lock"
+PEER_CACHE_DIR = WALLPAPER_DIR / "peer_cache"
+ANALYSIS_FILE = WALLPAPER_DIR / "analysis.json"
+SLIDESHOW_DIR = WALLPAPER_DIR / "slideshow"
+SLIDESHOW_FILE = WALLPAPER_DIR / "slideshow.json"
+LOCAL_INDEX_FILE = WALLPAPER_DIR / "local_index.json"
+PROFILES_DIR = WALLPAPER_DIR / "profiles"
+ARCHIVE_DIR = WALLPAPER_DIR / "archive"
+ARCHIVE_FILE = WALLPAPER_DIR / "archive.json"
+HISTORY_FILE = WALLPAPER_DIR / "history.json"
+CATALOG_FILE = WALLPAPER_DIR / "catalog.json"  # 由 --import-snapshot 写入，API 不可达时作为图片列表
+STATE_FILE = WALLPAPER_DIR / "state.json"  # 最近同步/更新时间与失败记录，供 --status 离线读取
+HTTP_CACHE_DIR = WALLPAPER_DIR / "http_cache"
+SPRITE_FILE = WALLPAPER_DIR / "history_sprites.jpg"
+SPRITE_INDEX_FILE = WALLPAPER_DIR / "history_sprites.json"
 
 # App
 CHECK_INTERVAL = 60
+PROFILE_KEEP = 20  # profiles/ 中保留的性能报告数
+SNAPSHOT_DAYS = 7  # --export-snapshot 默认打包的天数（含今天）
+STATE_FAILURES_KEEP = 50  # state.json 中保留的最近失败记录数
+STATUS_UNHEALTHY_FAILURES = 3  # 连续失败达到此数时 --status 报告不健康
+LOCK_TIMEOUT = 600  # 等待其他进程完成更新的最长时间（秒）
+CATALOG_TTL = 6 * 3600  # 常驻进程内图片列表的复用时长（秒）
+# 错峰：联网同步/下载分散到 STAGGER_WINDOW 秒内，预取在午夜前 PREFETCH_LEAD 秒开始
+# （config.json 中的 stagger_window / prefetch_lead 可覆盖）
+STAGGER_WINDOW = 3600
+PREFETCH_LEAD = 6 * 3600
+
+# 缩略图分析（需要 NumPy + Pillow）；config.json 中 "theme": "light" / "dark" 按亮度筛选
+THUMB_WIDTH = 64
+THEME_DARK_MAX = 0.4
+THEME_LIGHT_MIN = 0.55
+DUP_MAX_DISTANCE = 10  # 感知哈希汉明距离不超过此值视为同一场景的裁切/重传
+
+# 选图按屏幕宽高比排序：铺满屏幕时裁掉超过 RANK_MAX_CROP 的图片不参与选择（有合适图片时）；
+# 屏幕尺寸自动检测，config.json 中 "display_size": "3440x1440" 可覆盖；
+# 多显示器时每块屏幕各选一张，拼成跨屏图一次应用（"multi_monitor": false 关闭，"monitors" 可覆盖布局）
+RANK_MAX_CROP = 0.2
+RANK_ASPECT_STEPS = 32  # 宽高比分桶精度：log2(宽/高) 的 1/32
+
+# 轮播：config.json 中 "slideshow_minutes" > 0 时启用，池中保持若干张已按屏幕裁好的图片
+SLIDESHOW_POOL_SIZE = 5
+SLIDESHOW_RECENT = 50  # 最近展示过的 pageid 不再进池
+
+# 归档压缩：超过 archive_after_days 天（config.json，0 关闭）的旧壁纸按屏幕分辨率转为 WebP
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_QUALITY = 80
+
+# 历史记录：最多保留 HISTORY_MAX 张；缩略图拼在一张精灵图中，按格子偏移取用
+HISTORY_MAX = 200
+SPRITE_CELL = (160, 96)  # 16 的倍数，重新编码 JPEG 时已有格子基本不再失真
+SPRITE_COLUMNS = 8
+
+# 本地目录图源：config.json 中 "source": "local" + "source_path"
+LOCAL_SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff")
+
+# 手动刷新先应用 PREVIEW_WIDTH 宽的缩略图，原图在后台下载完成后替换（config.json "progressive": false 关闭）
+PREVIEW_WIDTH = 1280
+
+# 分段下载：config.json 中 download_segments > 1 时启用，仅用于不小于 SEGMENT_MIN_SIZE 的原图
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+MAX_DOWNLOAD_SEGMENTS = 8
+
+# api.php 响应的磁盘缓存：过期（超过响应的 max-age）后 HTTP_CACHE_SWR 秒内先用缓存、后台条件请求刷新
+# （config.json 中 "http_cache_swr" 可覆盖，"http_cache": false 关闭）。Commons 的 api.php 响应为
+# max-age=0 且不带校验值，窗口即缓存内容的最大陈旧时间，因此只取几分钟
+HTTP_CACHE_SWR = 10 * 60
+HTTP_CACHE_MAX_FILES = 500
+
+# 对冲请求（config.json 中 "hedge_requests": true）：API 请求超过近期 p90 延迟仍未返回时，
+# 再开一条连接重发，先返回者胜出；对冲次数不超过请求数的 HEDGE_BUDGET（外加 HEDGE_BURST 次）
+HEDGE_INITIAL_DELAY = 2.0
+HEDGE_MIN_DELAY = 0.25
+HEDGE_MAX_DELAY = 10.0
+HEDGE_BUDGET = 0.1
+HEDGE_BURST = 2
+
+# LAN peer cache (--serve-cache); clients opt in with "peer_url" in config.json
+PEER_PORT = 8765
+PEER_TIMEOUT = 10
+PEER_CACHE_MAX_FILES = 60
 APP_NAME = "DailyCommonsWallpaper"
 
 
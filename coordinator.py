@@ -0,0 +1,210 @@
+"""Update coordination - single-flight updates and a cross-process lock."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+from config import LOCK_FILE, LOCK_TIMEOUT
+from core import CancelToken, UpdateCancelled, ensure_dir, prefetch_wallpaper, update_wallpaper
+from progress import ProgressEvent
+
+
+class InterProcessLock:
+    """Exclusive OS-level lock on a file, shared by the tray and --once runs.
+
+    锁随进程退出由操作系统自动释放，不会因崩溃留下“死锁文件”。
+    """
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+        self._fh = None
+
+    def try_acquire(self) -> bool:
+        if self._fh is not None:
+            return True
+        ensure_dir()
+        fh = open(self._path, "a+b")
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._fh = fh
+        return True
+
+    def acquire(self, timeout: float = None, cancel_token: CancelToken | None = None, poll: float = 0.25) -> bool:
+        """Wait until the lock is ours; False on timeout, UpdateCancelled on cancel."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if cancel_token is not None:
+                cancel_token.sleep(poll)
+            else:
+                time.sleep(poll)
+        return True
+
+    def release(self):
+        fh, self._fh = self._fh, None
+        if fh is None:
+            return
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        finally:
+            fh.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _rank(force_refresh: bool, local_only: bool) -> int:
+    # 覆盖范围：仅本地 < 自动更新 < 手动刷新；范围更大的进行中操作可代替较小的请求
+    return 2 if force_refresh else (0 if local_only else 1)
+
+
+class _Flight:
+    def __init__(self, force_refresh: bool, local_only: bool = False):
+        self.force_refresh = force_refresh
+        self.local_only = local_only and not force_refresh
+        self.rank = _rank(force_refresh, self.local_only)
+        self.result = False
+        self.done = threading.Event()
+        self.listeners = []
+        self.waiters = []
+
+
+class UpdateCoordinator:
+    """Collapse concurrent update requests into one in-flight operation.
+
+    - 进行中的是手动刷新时，自动检查直接共享它的结果；
+    - 相同类型的请求共享同一次更新；
+    - 进行中的操作范围更小（如自动检查遇到手动刷新）时，等它结束后再单独执行一次。
+    实际执行前还要拿到 LOCK_FILE 上的进程间锁，避免与 --once / 计划任务并发。
+    """
+
+    def __init__(self, lock_path: Path = LOCK_FILE, lock_timeout: float = LOCK_TIMEOUT):
+        self._lock_path = lock_path
+        self._lock_timeout = lock_timeout
+        self._mutex = threading.Lock()
+        self._flight = None
+
+    def update(self, force_refresh: bool = False, progress_callback=None,
+               cancel_token: CancelToken | None = None, on_event=None, local_only: bool = False) -> bool:
+        def listener(event: ProgressEvent):
+            if progress_callback:
+                progress_callback(event.phase, event.percent)
+            if on_event:
+                on_event(event)
+
+        while True:
+            with self._mutex:
+                flight = self._flight
+                if flight is None:
+                    flight = self._flight = _Flight(force_refresh, local_only)
+                    flight.listeners.append(listener)
+                    leader = True
+                else:
+                    leader = False
+                    joins = flight.rank >= _rank(force_refresh, local_only)
+                    if joins:
+                        flight.listeners.append(listener)
+            if leader:
+                return self._lead(flight, cancel_token)
+            if joins:
+                return self._wait(flight, cancel_token)
+            # 进行中的操作不能代替本次请求：等它结束后重新排队
+            self._wait(flight, cancel_token)
+            if cancel_token is not None and cancel_token.cancelled:
+                return False
+
+    def _lead(self, flight: _Flight, cancel_token: CancelToken | None) -> bool:
+        def fan_out(event: ProgressEvent):
+            for fn in list(flight.listeners):
+                try:
+                    fn(event)
+                except Exception:
+                    pass
+
+        lock = InterProcessLock(self._lock_path)
+        ok = False
+        try:
+            if not lock.try_acquire():
+                fan_out(ProgressEvent("waiting", 0))
+                try:
+                    if not lock.acquire(timeout=self._lock_timeout, cancel_token=cancel_token):
+                        fan_out(ProgressEvent("error", 0))
+                        return False
+                except UpdateCancelled:
+                    fan_out(ProgressEvent("cancelled", 0))
+                    return False
+            ok = update_wallpaper(flight.force_refresh, cancel_token=cancel_token, on_event=fan_out,
+                                  local_only=flight.local_only)
+            return ok
+        finally:
+            lock.release()
+            with self._mutex:
+                self._flight = None
+                flight.result = ok
+                flight.done.set()
+                waiters = list(flight.waiters)
+            for ev in waiters:
+                ev.set()
+
+    def _wait(self, flight: _Flight, cancel_token: CancelToken | None) -> bool:
+        wake = threading.Event()
+        with self._mutex:
+            if flight.done.is_set():
+                return flight.result
+            flight.waiters.append(wake)
+        unregister = cancel_token.on_cancel(wake.set) if cancel_token else None
+        try:
+            wake.wait()
+        finally:
+            if unregister:
+                unregister()
+        return flight.result if flight.done.is_set() else False
+
+
+_coordinator = UpdateCoordinator()
+
+
+def coordinated_update(force_refresh: bool = False, progress_callback=None,
+                       cancel_token: CancelToken | None = None, on_event=None, local_only: bool = False) -> bool:
+    """update_wallpaper() behind the process-wide coordinator and the lock file."""
+    return _coordinator.update(force_refresh, progress_callback, cancel_token, on_event, local_only)
+
+
+_prefetch_mutex = threading.Lock()
+
+
+def coordinated_prefetch(days_ahead: int = 1, cancel_token: CancelToken | None = None) -> bool:
+    """prefetch_wallpaper() under the lock file; it is idempotent, so callers just queue up."""
+    with _prefetch_mutex:
+        lock = InterProcessLock(LOCK_FILE)
+        try:
+            if not lock.acquire(timeout=LOCK_TIMEOUT, cancel_token=cancel_token):
+                return False
+            return prefetch_wallpaper(days_ahead, cancel_token=cancel_token)
+        except UpdateCancelled:
+            return False
+        finally:
+            lock.release()
@@ -1,28 +1,165 @@
 """Core wallpaper logic - fetch, download, update."""
 
+import codecs
 import json
 import os
+import queue
 import random
 import re
+import socket
 import subprocess
 import sys
+import tempfile
+import threading
 import time
-from datetime import datetime
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
-from urllib.parse import quote, urlencode
-from urllib.request import Request, build_opener
+from urllib.parse import quote, urlencode, urlsplit
+from urllib.request import ProxyHandler, Request, build_opener
 from urllib.error import URLError, HTTPError
 
 from config import (
     API_URL,
     CACHE_FILE,
+    CATALOG_FILE,
+    CATALOG_TTL,
     CATEGORY,
     CONFIG_FILE,
+    HEDGE_BUDGET,
+    HEDGE_BURST,
+    HEDGE_INITIAL_DELAY,
+    HEDGE_MAX_DELAY,
+    HEDGE_MIN_DELAY,
+    HISTORY_FILE,
+    HISTORY_MAX,
+    LOCK_FILE,
+    LOCK_TIMEOUT,
+    MAX_DOWNLOAD_SEGMENTS,
     MIN_HEIGHT,
     MIN_WIDTH,
+    PEER_TIMEOUT,
+    PREFETCH_FILE,
+    PREVIEW_WIDTH,
+    SEGMENT_MIN_SIZE,
+    STATE_FAILURES_KEEP,
+    STATE_FILE,
+    SWAP_LOCK_FILE,
+    UPLOAD_HOST,
     WALLPAPER_DIR,
     _DATE_HASH_PRIME,
 )
+from metrics import (
+    API_HEDGES,
+    API_LATENCY,
+    API_REQUESTS,
+    API_RETRIES,
+    APPLY_SECONDS,
+    CACHE_HITS,
+    CACHE_MISSES,
+    DOWNLOAD_BYTES,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_THROUGHPUT,
+    UPDATES,
+)
+from progress import ProgressReporter
+
+
+class UpdateCancelled(Exception):
+    """Raised inside the update path once its CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """Cooperative cancellation shared between the UI and a running update.
+
+    更新线程在分块之间、重试退避等待期间检查该令牌；cancel() 还会立即中断
+    当前登记的连接（见 _aborter），让阻塞中的 read() 马上返回，而不是等到 60 秒超时。
+    回调在调用 cancel() 的线程（如 Tk 界面线程）上执行，必须立即返回。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        """Register callback to run on cancel; returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise UpdateCancelled()
+
+    def sleep(self, seconds: float):
+        """Sleep for seconds, waking up early (and raising) when cancelled."""
+        if self._event.wait(seconds):
+            raise UpdateCancelled()
+
+
+def _aborter(resp):
+    """Cancel callback for resp: shut its socket down so a read() blocked on it returns at once.
+
+    不能用 resp.close()：它要先拿到缓冲读取器的锁，而阻塞中的 read() 正持有该锁，
+    取消会一直卡到读超时。本地文件（file: 图源）没有套接字，读取也不会卡住。
+    """
+    def abort():
+        sock = getattr(getattr(getattr(resp, "fp", None), "raw", None), "_sock", None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    return abort
+
+
+def _check_cancel(cancel_token: CancelToken | None):
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+def _sleep(seconds: float, cancel_token: CancelToken | None = None):
+    if cancel_token is not None:
+        cancel_token.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def _remove_quietly(path: Path):
+    try:
+        path.unlink()
+    except OSError:
+        pass
 
 
 def ensure_dir():
@@ -39,10 +176,61 @@ def load_config() -> dict:
     return {"autostart": False}
 
 
+def _write_json_atomic(path: Path, data):
+    """Write JSON to a temp file in the same directory, then rename over path.
+
+    读者要么看到旧文件、要么看到完整的新文件，不会读到写了一半的 JSON。
+    """
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(5):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                # Windows 下目标文件被其他进程短暂打开时 rename 会失败，稍后重试
+                if attempt == 4:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    except BaseException:
+        _remove_quietly(Path(tmp))
+        raise
+
+
+_state_lock = threading.Lock()
+
+
+def _update_state(**changes):
+    """Merge changes into STATE_FILE (read by `wallpaper.py --status` without touching the network)."""
+    with _state_lock:
+        try:
+            with open(STATE_FILE, encoding="utf-8") as f:
+                state = json.load(f)
+            if not isinstance(state, dict):
+                state = {}
+        except (OSError, ValueError):
+            state = {}
+        failure = changes.pop("failure", None)
+        state.update(changes)
+        if failure is not None:
+            state["failures"] = (list(state.get("failures") or []) + [failure])[-STATE_FAILURES_KEEP:]
+            state["consecutive_failures"] = int(state.get("consecutive_failures") or 0) + 1
+        elif "last_success" in changes:
+            state["consecutive_failures"] = 0
+        try:
+            ensure_dir()
+            _write_json_atomic(STATE_FILE, state)
+        except OSError:
+            pass
+
+
 def save_config(config: dict):
     ensure_dir()
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    _write_json_atomic(CONFIG_FILE, config)
 
 
 def _strip_html(text: str) -> str:
@@ -62,19 +250,247 @@ def _open_with_proxies(req: Request, timeout: float):
     return opener.open(req, timeout=timeout)
 
 
-def _fetch_with_retry(req: Request, max_retries: int = 4, base_delay: float = 3.0):
-    """Fetch with retry (for boot when network may not be ready)."""
+# API 的 JSON（尤其是 extmetadata）压缩率很高；图片本身已压缩，不需要协商
+_API_HEADERS = {"User-Agent": "DailyCommonsWallpaper/1.0", "Accept-Encoding": "gzip, deflate"}
+
+
+def _read_json(resp, chunk: int = 65536):
+    """Read a JSON body, decompressing gzip/deflate and decoding UTF-8 as chunks arrive.
+
+    压缩数据边收边解压、边解码，不会先把整个压缩体和解压体都缓存在内存里。
+    """
+    encoding = (resp.headers.get("Content-Encoding") or "").strip().lower()
+    # wbits=47 自动识别 gzip / zlib 头；个别服务器返回的裸 deflate 在首块出错时再切换
+    inflater = zlib.decompressobj(zlib.MAX_WBITS | 32) if encoding in ("gzip", "x-gzip", "deflate") else None
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parts = []
+    first = True
+    while True:
+        b = resp.read(chunk)
+        if not b:
+            break
+        if inflater is not None:
+            try:
+                b = inflater.decompress(b)
+            except zlib.error:
+                if not (first and encoding == "deflate"):
+                    raise
+                inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+                b = inflater.decompress(b)
+        first = False
+        parts.append(decoder.decode(b))
+    if inflater is not None:
+        parts.append(decoder.decode(inflater.flush()))
+    parts.append(decoder.decode(b"", final=True))
+    return json.loads("".join(parts))
+
+
+def _open_direct(req: Request, timeout: float):
+    """Open HTTP request without any proxy (LAN peer cache)."""
+    return build_opener(ProxyHandler({})).open(req, timeout=timeout)
+
+
+def _peer_base_url() -> str:
+    return str(load_config().get("peer_url") or "").strip().rstrip("/")
+
+
+def _fetch_catalog_from_peer(limit: int, cancel_token: CancelToken | None = None) -> list[dict] | None:
+    """Catalog from the configured LAN peer (see peer.py); None when unset or unreachable."""
+    base = _peer_base_url()
+    if not base:
+        return None
+    _check_cancel(cancel_token)
+    req = Request(f"{base}/catalog?{urlencode({'limit': limit})}", headers=_API_HEADERS)
+    try:
+        with _open_direct(req, timeout=PEER_TIMEOUT) as resp:
+            data = _read_json(resp)
+    except (URLError, HTTPError, OSError, ValueError, zlib.error):
+        return None
+    images = data.get("images") if isinstance(data, dict) else None
+    if not isinstance(images, list):
+        return None
+    # 对端的目录不可信：只保留 Commons 原图地址，file: 或其他主机的条目不会被下载、也不会写入缓存
+    images = [im for im in images if isinstance(im, dict) and is_commons_upload(im.get("url", ""))]
+    return images or None
+
+
+def is_commons_upload(url) -> bool:
+    """Whether url is an https URL on the Commons upload host."""
+    if not isinstance(url, str):
+        return False
+    parsed = urlsplit(url)
+    return parsed.scheme == "https" and parsed.hostname == UPLOAD_HOST
+
+
+def _fetch_json_once(req: Request, cancel_token: CancelToken | None = None):
+    return _fetch_response_once(req, cancel_token)[0]
+
+
+def _fetch_response_once(req: Request, cancel_token: CancelToken | None = None, timeout: float = 30) -> tuple:
+    """(parsed JSON, response headers); (None, headers) for 304 Not Modified."""
+    try:
+        resp = _open_with_proxies(req, timeout=timeout)
+    except HTTPError as e:
+        # 条件请求命中：urllib 把 304 当作错误抛出
+        if e.code == 304:
+            return None, e.headers
+        raise
+    with resp:
+        unregister = cancel_token.on_cancel(_aborter(resp)) if cancel_token else None
+        try:
+            return _read_json(resp), resp.headers
+        finally:
+            if unregister:
+                unregister()
+
+
+class _HedgePolicy:
+    """Adaptive hedge delay (p90 of recent API latencies) and a hedge budget."""
+
+    def __init__(self, window: int = 64, budget: float = HEDGE_BUDGET, burst: int = HEDGE_BURST):
+        self._latencies = deque(maxlen=window)
+        self._budget = budget
+        self._burst = burst
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 10:
+            return HEDGE_INITIAL_DELAY
+        p90 = samples[int(0.9 * (len(samples) - 1))]
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p90))
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def start_request(self):
+        with self._lock:
+            self._requests += 1
+
+    def try_hedge(self) -> bool:
+        # 预算：对冲总数不超过 请求数 * budget + burst，总请求量最多增加约 budget
+        with self._lock:
+            if self._hedges + 1 > self._requests * self._budget + self._burst:
+                return False
+            self._hedges += 1
+            return True
+
+
+_hedge_policy = _HedgePolicy()
+
+
+def _hedging_enabled() -> bool:
+    return bool(load_config().get("hedge_requests"))
+
+
+def _fetch_json_hedged(req: Request, cancel_token: CancelToken | None = None, fetch=_fetch_json_once):
+    """fetch() (default _fetch_json_once), plus a second connection if the first is slower than the hedge delay.
+
+    先返回成功结果的请求胜出，另一条连接随即关闭；两者都失败时抛出最后一个错误。
+    """
+    policy = _hedge_policy
+    policy.start_request()
+    results = queue.Queue()
+    attempts = []
+
+    def run(token: CancelToken):
+        try:
+            results.put((token, fetch(req, token), None))
+        except Exception as e:
+            results.put((token, None, e))
+
+    def launch() -> CancelToken:
+        token = CancelToken()
+        unlink = cancel_token.on_cancel(token.cancel) if cancel_token else None
+        attempts.append((token, unlink))
+        threading.Thread(target=run, args=(token,), name="ApiRequestThread", daemon=True).start()
+        return token
+
+    started = time.perf_counter()
+    launch()
+    hedge = None
+    try:
+        try:
+            item = results.get(timeout=policy.delay())
+        except queue.Empty:
+            if policy.try_hedge():
+                hedge = launch()
+            item = results.get()
+        pending = len(attempts)
+        while True:
+            token, data, error = item
+            pending -= 1
+            if error is None:
+                # 从首个请求发出时计时：对冲胜出时样本包含已等待的延迟，慢请求不会从分布中消失，
+                # 否则 p90 会越来越低、对冲越来越频繁
+                policy.record(time.perf_counter() - started)
+                if hedge is not None:
+                    API_HEDGES.inc(winner="hedge" if token is hedge else "primary")
+                return data
+            if pending == 0:
+                _check_cancel(cancel_token)
+                raise error
+            item = results.get()
+    finally:
+        # 关闭落败（或仍在进行）的连接
+        for token, unlink in attempts:
+            token.cancel()
+            if unlink:
+                unlink()
+
+
+def _fetch_with_retry(req: Request, max_retries: int = 4, base_delay: float = 3.0,
+                      cancel_token: CancelToken | None = None, timeout: float = 30):
+    """Fetch with retry (for boot when network may not be ready).
+
+    api.php 的请求经过磁盘 HTTP 缓存（httpcache.py）：新鲜时不联网，过期后发条件请求，
+    在 stale-while-revalidate 窗口内先返回缓存、后台刷新。
+    """
+    def fetch(r: Request, token: CancelToken | None, retries: int = max_retries):
+        return _fetch_response_with_retry(r, retries, base_delay, token, timeout)
+
+    if req.full_url.startswith(API_URL):
+        from httpcache import cached_fetch
+        return cached_fetch(req, fetch, cancel_token)
+    result = fetch(req, cancel_token)
+    return result[0] if result else None
+
+
+def _fetch_response_with_retry(req: Request, max_retries: int, base_delay: float,
+                               cancel_token: CancelToken | None = None, timeout: float = 30) -> tuple | None:
+    """(data, headers) from _fetch_response_once(), retried; None after the last failed attempt."""
+    hedged = _hedging_enabled()
     for attempt in range(max_retries):
+        _check_cancel(cancel_token)
+        started = time.perf_counter()
         try:
-            with _open_with_proxies(req, timeout=30) as resp:
-                return json.loads(resp.read().decode())
-        except (URLError, HTTPError, OSError):
+            if hedged:
+                result = _fetch_json_hedged(req, cancel_token,
+                                            fetch=lambda r, token: _fetch_response_once(r, token, timeout))
+            else:
+                result = _fetch_response_once(req, cancel_token, timeout)
+            API_LATENCY.observe(time.perf_counter() - started)
+            API_REQUESTS.inc(result="ok")
+            return result
+        except (URLError, HTTPError, OSError, ValueError, zlib.error):
+            API_REQUESTS.inc(result="error")
+            _check_cancel(cancel_token)
             if attempt < max_retries - 1:
-                time.sleep(base_delay * (attempt + 1))
+                API_RETRIES.inc()
+                _sleep(base_delay * (attempt + 1), cancel_token)
     return None
 
 
-def fetch_images_from_commons(limit: int = 200) -> list[dict]:
+def fetch_images_from_commons(limit: int = 200, cancel_token: CancelToken | None = None,
+                              use_peer: bool = True) -> list[dict]:
+    if use_peer:
+        images = _fetch_catalog_from_peer(limit, cancel_token)
+        if images:
+            return images
     params = {
         "action": "query",
         "generator": "categorymembers",
@@ -87,8 +503,8 @@ def fetch_images_from_commons(limit: int = 200) -> list[dict]:
         "format": "json",
     }
     url = f"{API_URL}?{urlencode(params)}"
-    req = Request(url, headers={"User-Agent": "DailyCommonsWallpaper/1.0"})
-    data = _fetch_with_retry(req)
+    req = Request(url, headers=_API_HEADERS)
+    data = _fetch_with_retry(req, cancel_token=cancel_token)
     if not data:
         return []
     images = []
@@ -105,6 +521,8 @@ def fetch_images_from_commons(limit: int = 200) -> list[dict]:
                 "title": page.get("title", "").replace("File:", ""),
                 "url": info["url"],
                 "descriptionurl": info.get("descriptionurl", ""),
+                "width": w,
+                "height": h,
                 "metadata": {
                     "title": _strip_html(extmeta.get("ObjectName", {}).get("value", "")),
                     "description": _strip_html(extmeta.get("ImageDescription", {}).get("value", "")),
@@ -116,6 +534,49 @@ def fetch_images_from_commons(limit: int = 200) -> list[dict]:
     return images
 
 
+_catalog_lock = threading.Lock()
+_catalog_memo = {}
+
+
+def get_catalog(limit: int = 500, cancel_token: CancelToken | None = None, max_age: float = CATALOG_TTL,
+                use_peer: bool = True) -> list[dict]:
+    """fetch_images_from_commons() memoized in-process for max_age seconds.
+
+    常驻托盘进程反复刷新时直接复用已拉取的图片列表；失败结果不缓存。
+    """
+    from sources import get_source
+
+    source = get_source()
+    key = (source.cache_key(), limit)
+    with _catalog_lock:
+        hit = _catalog_memo.get(key)
+        if hit and time.monotonic() - hit[0] < max_age:
+            CACHE_HITS.inc(cache="catalog")
+            return hit[1]
+    CACHE_MISSES.inc(cache="catalog")
+    images = source.list_images(limit, cancel_token=cancel_token, use_peer=use_peer)
+    if images:
+        with _catalog_lock:
+            _catalog_memo[key] = (time.monotonic(), images)
+        _update_state(last_sync=datetime.now().isoformat(timespec="seconds"), last_sync_source=source.name,
+                      catalog_size=len(images))
+    elif source.name == "commons":
+        # 离线时退回快照导入的图片列表（不缓存，联网后即恢复使用 API）
+        images = _load_catalog_snapshot()
+        if images:
+            CACHE_HITS.inc(cache="catalog_snapshot")
+    return images
+
+
+def _load_catalog_snapshot() -> list[dict]:
+    try:
+        with open(CATALOG_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return [im for im in data if isinstance(im, dict) and im.get("url")] if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
+
+
 def fetch_image_metadata(file_title: str) -> dict:
     params = {
         "action": "query",
@@ -126,10 +587,10 @@ def fetch_image_metadata(file_title: str) -> dict:
         "format": "json",
     }
     url = f"{API_URL}?{urlencode(params)}"
-    req = Request(url, headers={"User-Agent": "DailyCommonsWallpaper/1.0"})
+    req = Request(url, headers=_API_HEADERS)
     try:
-        with _open_with_proxies(req, timeout=15) as resp:
-            data = json.loads(resp.read().decode())
+        # 元数据只用于显示，沿用较短的 15 秒超时
+        data = _fetch_with_retry(req, max_retries=1, timeout=15) or {}
         pages = data.get("query", {}).get("pages", {})
         for page in pages.values():
             if "imageinfo" in page and page["imageinfo"]:
@@ -148,45 +609,266 @@ def fetch_image_metadata(file_title: str) -> dict:
     return {}
 
 
-def download_image(url: str, filepath: Path, progress_callback=None, max_retries: int = 3) -> bool:
-    base_delay = 2.0
-    for attempt in range(max_retries):
+def _stream_to_file(req: Request, part_path: Path, opener, timeout: float, progress_callback=None,
+                    cancel_token: CancelToken | None = None, reporter: ProgressReporter | None = None):
+    """Stream one response into part_path; raises on error, truncation or cancel."""
+    with opener(req, timeout=timeout) as resp:
+        unregister = cancel_token.on_cancel(_aborter(resp)) if cancel_token else None
         try:
-            req = Request(url, headers={"User-Agent": "DailyCommonsWallpaper/1.0"})
-            with _open_with_proxies(req, timeout=60) as resp:
-                total = int(resp.headers.get("Content-Length", 0) or 0)
-                data = []
-                read = 0
-                chunk = 65536
+            total = int(resp.headers.get("Content-Length", 0) or 0)
+            read = 0
+            chunk = 65536
+            with open(part_path, "wb") as f:
                 while True:
+                    _check_cancel(cancel_token)
                     b = resp.read(chunk)
                     if not b:
                         break
-                    data.append(b)
+                    f.write(b)
                     read += len(b)
+                    if reporter:
+                        reporter.transfer(read, total)
                     if progress_callback and total > 0:
                         pct = min(100, int(read * 100 / total))
                         progress_callback("downloading", pct)
-            filepath.write_bytes(b"".join(data))
-            return True
+        finally:
+            if unregister:
+                unregister()
+    _check_cancel(cancel_token)
+    if total and read != total:
+        raise OSError(f"truncated download: {read}/{total} bytes")
+
+
+def _segment_count() -> int:
+    try:
+        n = int(load_config().get("download_segments", 1))
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(MAX_DOWNLOAD_SEGMENTS, n))
+
+
+def _probe_ranges(url: str, cancel_token: CancelToken | None = None) -> tuple[int, str]:
+    """HEAD url; return (size, validator) when the server accepts byte ranges, else (0, "")."""
+    _check_cancel(cancel_token)
+    req = Request(url, headers={"User-Agent": "DailyCommonsWallpaper/1.0"}, method="HEAD")
+    try:
+        with _open_with_proxies(req, timeout=15) as resp:
+            if (resp.headers.get("Accept-Ranges") or "").strip().lower() != "bytes":
+                return 0, ""
+            size = int(resp.headers.get("Content-Length", 0) or 0)
+            validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified") or ""
+            return size, validator
+    except (URLError, HTTPError, OSError, ValueError):
+        return 0, ""
+
+
+def _fetch_range(url: str, part_path: Path, start: int, end: int, validator: str,
+                 cancel_token: CancelToken, on_bytes, max_retries: int = 3):
+    """Write bytes [start, end] of url at their offset in part_path, resuming on retry."""
+    pos = start
+    for attempt in range(max_retries):
+        _check_cancel(cancel_token)
+        headers = {"User-Agent": "DailyCommonsWallpaper/1.0", "Range": f"bytes={pos}-{end}"}
+        if validator:
+            # 文件在分段之间被替换时服务器会返回 200 全量，下面的 206 校验即可发现
+            headers["If-Range"] = validator
+        try:
+            with _open_with_proxies(Request(url, headers=headers), timeout=60) as resp:
+                content_range = resp.headers.get("Content-Range") or ""
+                if resp.status != 206 or not content_range.startswith(f"bytes {pos}-{end}/"):
+                    raise ValueError(f"unexpected range response: {resp.status} {content_range}")
+                unregister = cancel_token.on_cancel(_aborter(resp))
+                try:
+                    with open(part_path, "r+b") as f:
+                        f.seek(pos)
+                        while pos <= end:
+                            _check_cancel(cancel_token)
+                            b = resp.read(min(65536, end - pos + 1))
+                            if not b:
+                                break
+                            f.write(b)
+                            pos += len(b)
+                            on_bytes(len(b))
+                finally:
+                    unregister()
+            if pos > end:
+                return
+        except ValueError:
+            _check_cancel(cancel_token)
+            raise
         except (URLError, HTTPError, OSError):
+            _check_cancel(cancel_token)
+        if attempt < max_retries - 1:
+            cancel_token.sleep(1.0 * (attempt + 1))
+    raise OSError(f"range {start}-{end} incomplete at {pos}")
+
+
+def _download_segmented(url: str, part_path: Path, total: int, validator: str, segments: int,
+                        cancel_token: CancelToken | None = None, reporter: ProgressReporter | None = None):
+    """Fetch url as `segments` parallel byte ranges into a preallocated part_path."""
+    # 内部令牌：外部取消或任一分段失败时，让其余分段立即停止
+    inner = CancelToken()
+    unlink = cancel_token.on_cancel(inner.cancel) if cancel_token else None
+    done = [0]
+    lock = threading.Lock()
+
+    def on_bytes(n: int):
+        with lock:
+            done[0] += n
+            value = done[0]
+        if reporter:
+            reporter.transfer(value, total)
+
+    step = -(-total // segments)
+    ranges = [(start, min(start + step, total) - 1) for start in range(0, total, step)]
+    try:
+        with open(part_path, "wb") as f:
+            f.truncate(total)
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="SegmentThread") as pool:
+            futures = [pool.submit(_fetch_range, url, part_path, a, b, validator, inner, on_bytes)
+                       for a, b in ranges]
+            try:
+                for fut in as_completed(futures):
+                    fut.result()
+            except BaseException:
+                inner.cancel()
+                raise
+    except UpdateCancelled:
+        _check_cancel(cancel_token)
+        raise OSError("segmented download aborted")
+    finally:
+        if unlink:
+            unlink()
+    _check_cancel(cancel_token)
+    if done[0] != total or part_path.stat().st_size != total:
+        raise OSError(f"segmented download size mismatch: {done[0]}/{total}")
+
+
+def _record_download(filepath: Path, started: float, source: str):
+    try:
+        size = filepath.stat().st_size
+    except OSError:
+        return
+    DOWNLOAD_BYTES.inc(size, source=source)
+    elapsed = time.perf_counter() - started
+    if elapsed > 0:
+        DOWNLOAD_THROUGHPUT.observe(size / elapsed)
+
+
+def download_image(url: str, filepath: Path, progress_callback=None, max_retries: int = 3,
+                   cancel_token: CancelToken | None = None, reporter: ProgressReporter | None = None,
+                   use_peer: bool = True) -> bool:
+    """Stream url into filepath via a .part file; raises UpdateCancelled on cancel.
+
+    reporter receives raw byte counts per chunk and coalesces them itself;
+    progress_callback keeps the old per-chunk ("downloading", pct) contract.
+    配置了 peer_url 时先向局域网缓存节点请求一次，失败再回源 Commons；
+    download_segments > 1 且服务器支持 Range 时大文件分段并行下载。
+    """
+    base_delay = 2.0
+    started = time.perf_counter()
+    part_path = filepath.with_name(filepath.name + ".part")
+    headers = {"User-Agent": "DailyCommonsWallpaper/1.0"}
+    if url.startswith("file:"):
+        # 本地目录图源：直接复制，不经过 peer / 分段下载 / 重试
+        try:
+            _stream_to_file(Request(url), part_path, _open_direct, 60, progress_callback, cancel_token, reporter)
+            os.replace(part_path, filepath)
+            _record_download(filepath, started, "local")
+            return True
+        except UpdateCancelled:
+            _remove_quietly(part_path)
+            raise
+        except (URLError, OSError, ValueError):
+            _remove_quietly(part_path)
+            return False
+    peer = _peer_base_url() if use_peer else ""
+    if peer:
+        req = Request(f"{peer}/image?{urlencode({'url': url})}", headers=headers)
+        try:
+            _stream_to_file(req, part_path, _open_direct, PEER_TIMEOUT, progress_callback, cancel_token, reporter)
+            os.replace(part_path, filepath)
+            _record_download(filepath, started, "peer")
+            return True
+        except UpdateCancelled:
+            _remove_quietly(part_path)
+            raise
+        except (URLError, HTTPError, OSError, ValueError):
+            _remove_quietly(part_path)
+            _check_cancel(cancel_token)
+    segments = _segment_count()
+    if segments > 1:
+        total, validator = _probe_ranges(url, cancel_token)
+        if total >= SEGMENT_MIN_SIZE:
+            try:
+                _download_segmented(url, part_path, total, validator, segments, cancel_token, reporter)
+                os.replace(part_path, filepath)
+                _record_download(filepath, started, "segmented")
+                return True
+            except UpdateCancelled:
+                _remove_quietly(part_path)
+                raise
+            except (URLError, HTTPError, OSError, ValueError):
+                # 服务器不支持或分段校验失败：回退到单连接下载
+                _remove_quietly(part_path)
+                _check_cancel(cancel_token)
+    for attempt in range(max_retries):
+        _check_cancel(cancel_token)
+        try:
+            req = Request(url, headers=headers)
+            _stream_to_file(req, part_path, _open_with_proxies, 60, progress_callback, cancel_token, reporter)
+            os.replace(part_path, filepath)
+            _record_download(filepath, started, "direct")
+            return True
+        except UpdateCancelled:
+            _remove_quietly(part_path)
+            raise
+        except (URLError, HTTPError, OSError, ValueError):
+            # cancel() 会从其他线程关闭连接，read() 此时抛出的异常按取消处理
+            _remove_quietly(part_path)
+            _check_cancel(cancel_token)
             if attempt < max_retries - 1:
-                time.sleep(base_delay * (attempt + 1))
+                DOWNLOAD_RETRIES.inc()
+                _sleep(base_delay * (attempt + 1), cancel_token)
     return False
 
 
-def set_windows_wallpaper(filepath: Path) -> bool:
+def _set_wallpaper_style(span: bool):
+    """Span stretches one image across all monitors; a single image afterwards goes back to Fill."""
+    import winreg
+    try:
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Control Panel\Desktop", 0,
+                            winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE) as key:
+            try:
+                current = str(winreg.QueryValueEx(key, "WallpaperStyle")[0])
+            except OSError:
+                current = ""
+            # 只在跨屏与单图之间切换时改写，保留用户自己选的其他样式
+            style = "22" if span else ("10" if current == "22" else None)
+            if style and style != current:
+                winreg.SetValueEx(key, "WallpaperStyle", 0, winreg.REG_SZ, style)
+                winreg.SetValueEx(key, "TileWallpaper", 0, winreg.REG_SZ, "0")
+    except OSError:
+        pass
+
+
+def set_windows_wallpaper(filepath: Path, span: bool = False) -> bool:
     try:
         import ctypes
+        _set_wallpaper_style(span)
         ctypes.windll.user32.SystemParametersInfoW(0x0014, 0, str(filepath.resolve()), 3)
         return True
     except Exception:
         return False
 
 
-def set_wallpaper(filepath: Path) -> bool:
+def set_wallpaper(filepath: Path, span: bool = False) -> bool:
+    """Apply filepath; span=True stretches it across the virtual desktop (multimonitor.py)."""
     if sys.platform == "win32":
-        return set_windows_wallpaper(filepath)
+        started = time.perf_counter()
+        ok = set_windows_wallpaper(filepath, span)
+        APPLY_SECONDS.observe(time.perf_counter() - started)
+        return ok
     return False
 
 
@@ -194,13 +876,72 @@ def get_date_id() -> int:
     return int(datetime.now().strftime("%Y%m%d"))
 
 
-def select_image(images: list[dict], seed: int = None) -> dict:
+def _theme_preference() -> str | None:
+    theme = load_config().get("theme")
+    return theme if theme in ("light", "dark") else None
+
+
+def _filter_by_theme(sorted_images: list[dict], theme: str) -> list[dict]:
+    """Keep entries whose cached thumbnail brightness suits theme (no network)."""
+    try:
+        from analysis import load_analysis, matches_theme
+        from config import THEME_DARK_MAX, THEME_LIGHT_MIN
+    except ImportError:
+        return sorted_images
+    stats = load_analysis()
+    return [im for im in sorted_images
+            if matches_theme(stats.get(str(im.get("pageid"))), theme, THEME_DARK_MAX, THEME_LIGHT_MIN)]
+
+
+def _collapse_duplicates(sorted_images: list[dict]) -> list[dict]:
+    """One candidate per near-duplicate cluster (by cached perceptual hash)."""
+    try:
+        from dedupe import get_index
+    except ImportError:
+        return sorted_images
+    index = get_index()
+    return index.collapse(sorted_images) if index else sorted_images
+
+
+def select_image(images: list[dict], seed: int = None, theme: str = None,
+                 display: tuple[int, int] = None) -> dict:
     if not images:
         return None
+    from display import get_display_size
+
+    return select_images(images, seed, theme, [(0, 0, *(display or get_display_size()))])[0]
+
+
+def select_images(images: list[dict], seed: int = None, theme: str = None,
+                  monitors: list[tuple[int, int, int, int]] = None) -> list[dict]:
+    """One pick per monitor ((left, top, width, height), primary first), distinct while candidates last.
+
+    主显示器的选择与 select_image() 相同（预取文件可直接复用）；其余显示器由同一种子派生，
+    与已选图片重复时顺延到下一个候选。
+    """
+    if not images:
+        return []
+    from display import get_monitors
+    from ranking import get_index
+
     seed = seed if seed is not None else get_date_id()
-    sorted_images = sorted(images, key=lambda x: x.get("pageid", 0) or 0)
-    index = ((seed * _DATE_HASH_PRIME) & 0xFFFFFFFF) % len(sorted_images)
-    return sorted_images[index]
+    index = get_index(images)
+    picks, taken = [], set()
+    for i, (_, _, width, height) in enumerate(monitors or get_monitors()):
+        # 候选列表（去重、主题筛选、按屏幕宽高比与分辨率保留最合适的一档）每种屏幕尺寸只计算一次；
+        # 主题筛选只在已分析过的图片中进行，尚无分析结果时退回完整列表
+        candidates = index.candidates((width, height), theme)
+        key = seed if i == 0 else zlib.crc32(f"{seed}/{i}".encode())
+        start = ((key * _DATE_HASH_PRIME) & 0xFFFFFFFF) % len(candidates)
+        pick = candidates[start]
+        for offset in range(len(candidates)):
+            candidate = candidates[(start + offset) % len(candidates)]
+            if candidate.get("url") not in taken:
+                pick = candidate
+                break
+        taken.add(pick.get("url"))
+        picks.append(pick)
+    return picks
 
 
 def get_file_extension(url: str) -> str:
@@ -210,6 +951,257 @@ def get_file_extension(url: str) -> str:
     return ".jpg"
 
 
+def _date_id_for(days_ahead: int = 0) -> int:
+    return int((datetime.now() + timedelta(days=days_ahead)).strftime("%Y%m%d"))
+
+
+def _cache_entry(selected: dict, filepath: Path, date_id: int) -> dict:
+    metadata = selected.get("metadata", {})
+    return {
+        "path": str(filepath),
+        "title": selected["title"],
+        "url": selected["url"],
+        "descriptionurl": selected.get("descriptionurl", ""),
+        "date": datetime.now().isoformat(),
+        "date_id": date_id,
+        "metadata": {
+            "title": metadata.get("title") or selected["title"],
+            "description": metadata.get("description", ""),
+            "artist": metadata.get("artist", ""),
+            "license": metadata.get("license", ""),
+            "credit": metadata.get("credit", ""),
+        }
+    }
+
+
+def load_history() -> list[dict]:
+    """Applied wallpapers as cache entries, oldest first."""
+    try:
+        with open(HISTORY_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return [e for e in data if isinstance(e, dict)] if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def _save_current(entry: dict):
+    """Write CACHE_FILE and move the entry to the end of the history.
+
+    同一张图片（按 url）只保留一条：预览图替换为原图、从历史中重新应用时都是更新原记录。
+    """
+    _write_json_atomic(CACHE_FILE, entry)
+    history = [e for e in load_history() if e.get("url") != entry.get("url")]
+    history.append(entry)
+    _write_json_atomic(HISTORY_FILE, history[-HISTORY_MAX:])
+
+
+def _load_prefetch() -> dict:
+    if not PREFETCH_FILE.exists():
+        return {}
+    try:
+        with open(PREFETCH_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def _get_prefetched(date_id: int) -> dict | None:
+    entry = _load_prefetch().get(str(date_id))
+    if entry and Path(entry.get("path", "")).exists():
+        return entry
+    return None
+
+
+def prefetch_wallpaper(days_ahead: int = 1, cancel_token: CancelToken | None = None) -> bool:
+    """Download the wallpaper of a future day without applying it.
+
+    update_wallpaper() 在当天首次运行时直接应用预取文件，无需联网。
+    """
+    from display import get_monitors
+
+    ensure_dir()
+    date_id = _date_id_for(days_ahead)
+    monitors = get_monitors()
+    existing = _get_prefetched(date_id)
+    if existing and _layout_matches(existing, monitors):
+        return True
+    images = get_catalog(limit=500, cancel_token=cancel_token)
+    if len(monitors) > 1:
+        # 多显示器：每块屏幕的图片都预取好，午夜的本地切换才能不联网完成
+        from multimonitor import download_for_monitors
+        entry = download_for_monitors(images, monitors, date_id, _theme_preference(),
+                                      cancel_token, require_all=True)
+        if not entry:
+            return False
+    else:
+        selected = select_image(images, date_id, theme=_theme_preference())
+        if not selected:
+            return False
+        filepath = WALLPAPER_DIR / f"wallpaper_{date_id}{get_file_extension(selected['url'])}"
+        if not filepath.exists() and not download_image(selected["url"], filepath, cancel_token=cancel_token):
+            return False
+        entry = _cache_entry(selected, filepath, date_id)
+    today = get_date_id()
+    entries = {k: v for k, v in _load_prefetch().items() if k.isdigit() and int(k) >= today}
+    entries[str(date_id)] = entry
+    _write_json_atomic(PREFETCH_FILE, entries)
+    return True
+
+
+def _progressive_enabled() -> bool:
+    return load_config().get("progressive", True) is not False
+
+
+def _fetch_preview_url(selected: dict, width: int = PREVIEW_WIDTH,
+                       cancel_token: CancelToken | None = None) -> str | None:
+    """Thumbnail rendition of selected about `width` px wide (a few hundred KB)."""
+    if not selected.get("pageid") or selected.get("source") == "local":
+        return None
+    params = {
+        "action": "query",
+        "pageids": selected["pageid"],
+        "prop": "imageinfo",
+        "iiprop": "url",
+        "iiurlwidth": width,
+        "format": "json",
+    }
+    req = Request(f"{API_URL}?{urlencode(params)}", headers=_API_HEADERS)
+    data = _fetch_with_retry(req, max_retries=1, cancel_token=cancel_token)
+    for page in (data or {}).get("query", {}).get("pages", {}).values():
+        info = (page.get("imageinfo") or [{}])[0]
+        if info.get("thumburl") and info["thumburl"] != selected["url"]:
+            return info["thumburl"]
+    return None
+
+
+def _verify_image(path: Path) -> bool:
+    try:
+        from PIL import Image
+    except ImportError:
+        return path.stat().st_size > 0
+    try:
+        with Image.open(path) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+def _apply_preview(selected: dict, filepath: Path, select_id: int, reporter: ProgressReporter,
+                   cancel_token: CancelToken | None) -> dict | None:
+    """Download and apply a small rendition; the cache entry remembers where the full image goes."""
+    url = _fetch_preview_url(selected, cancel_token=cancel_token)
+    if not url:
+        return None
+    preview_path = filepath.with_name(f"{filepath.stem}_preview{get_file_extension(url)}")
+    reporter.phase("downloading", 15, until=85)
+    if not download_image(url, preview_path, cancel_token=cancel_token, reporter=reporter):
+        return None
+    if cancel_token is not None and cancel_token.cancelled:
+        _remove_quietly(preview_path)
+        raise UpdateCancelled()
+    reporter.phase("setting", 90)
+    if not set_wallpaper(preview_path):
+        _remove_quietly(preview_path)
+        return None
+    entry = _cache_entry(selected, preview_path, select_id)
+    entry.update(preview=True, full_path=str(filepath))
+    _save_current(entry)
+    reporter.phase("done", 100)
+    return entry
+
+
+def _complete_progressive(entry: dict, cancel_token: CancelToken | None = None, locked: bool = False) -> bool:
+    """Download the full image of a preview entry, verify it and swap it in.
+
+    只有当前壁纸仍是这张预览图时才替换；期间用户已换成别的壁纸则丢弃。
+    locked=True 表示调用方已持有 LOCK_FILE（更新流程内部）。
+    另一线程或进程正在替换时返回 False：不重复下载同一张原图，由它完成替换。
+    """
+    from coordinator import InterProcessLock
+
+    swap_lock = InterProcessLock(SWAP_LOCK_FILE)
+    if not swap_lock.try_acquire():
+        return False
+    try:
+        return _swap_in_full_image(entry, cancel_token, locked)
+    finally:
+        swap_lock.release()
+
+
+def _swap_in_full_image(entry: dict, cancel_token: CancelToken | None, locked: bool) -> bool:
+    from coordinator import InterProcessLock
+
+    preview_path, full_path = Path(entry["path"]), Path(entry["full_path"])
+    if not full_path.exists() and not download_image(entry["url"], full_path, cancel_token=cancel_token):
+        return False
+    if not _verify_image(full_path):
+        _remove_quietly(full_path)
+        return False
+    lock = None
+    if not locked:
+        lock = InterProcessLock(LOCK_FILE)
+        if not lock.acquire(timeout=LOCK_TIMEOUT, cancel_token=cancel_token):
+            return False
+    try:
+        _, cache = _is_cache_from_today()
+        if cache.get("path") != str(preview_path):
+            _remove_quietly(full_path)
+            _remove_quietly(preview_path)
+            return False
+        if not set_wallpaper(full_path):
+            return False
+        final = {k: v for k, v in entry.items() if k not in ("preview", "full_path")}
+        final["path"] = str(full_path)
+        _save_current(final)
+        _remove_quietly(preview_path)
+        return True
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+_pending_swaps = []
+
+
+def _complete_progressive_in_background(entry: dict):
+    def run():
+        try:
+            _complete_progressive(entry)
+        except Exception:
+            pass
+
+    thread = threading.Thread(target=run, name="FullImageThread", daemon=True)
+    _pending_swaps.append(thread)
+    thread.start()
+
+
+def wait_for_pending_swaps(timeout: float = None):
+    """Block until background full-image swaps finish (short-lived processes call this before exiting)."""
+    while _pending_swaps:
+        _pending_swaps.pop().join(timeout)
+
+
+def _layout_matches(entry: dict, monitors: list[tuple[int, int, int, int]]) -> bool:
+    """Whether entry was made for this monitor layout (single-monitor entries fit any single monitor)."""
+    if len(monitors) > 1:
+        layout = entry.get("layout")
+        return layout == [list(m) for m in monitors] and all(
+            Path(m.get("path", "")).is_file() for m in entry.get("monitors") or [{}])
+    return not entry.get("span")
+
+
+def _apply_prefetched(entry: dict, monitors: list[tuple[int, int, int, int]], date_id: int) -> bool:
+    if len(monitors) > 1:
+        from multimonitor import apply_span
+        return apply_span(entry, monitors, date_id)
+    if not set_wallpaper(Path(entry["path"])):
+        return False
+    _save_current(dict(entry, date=datetime.now().isoformat()))
+    return True
+
+
 def _is_cache_from_today() -> tuple[bool, dict]:
     if not CACHE_FILE.exists():
         return False, {}
@@ -225,37 +1217,101 @@ def _is_cache_from_today() -> tuple[bool, dict]:
         return False, {}
 
 
-def update_wallpaper(force_refresh: bool = False, progress_callback=None) -> bool:
-    def _report(step: str, percent: int = None):
+def update_wallpaper(force_refresh: bool = False, progress_callback=None,
+                     cancel_token: CancelToken | None = None, on_event=None, local_only: bool = False) -> bool:
+    """Update today's wallpaper.
+
+    progress_callback(step, percent) and on_event(ProgressEvent) both receive
+    coalesced progress (phase changes immediately, byte progress at a fixed rate).
+    local_only only applies today's cached or prefetched wallpaper, never the network.
+    """
+    def _dispatch(event):
         if progress_callback:
-            progress_callback(step, percent)
+            progress_callback(event.phase, event.percent)
+        if on_event:
+            on_event(event)
+
+    reporter = ProgressReporter(on_event=_dispatch)
+    mode = "force" if force_refresh else ("local" if local_only else "auto")
+    try:
+        ok = _update_wallpaper(force_refresh, reporter, cancel_token, local_only)
+    except UpdateCancelled:
+        UPDATES.inc(mode=mode, result="cancelled")
+        reporter.phase("cancelled", 0)
+        return False
+    UPDATES.inc(mode=mode, result="ok" if ok else "failed")
+    now = datetime.now().isoformat(timespec="seconds")
+    if ok:
+        _update_state(last_update=now, last_success=now)
+    elif not local_only:
+        # 午夜的本地切换没有预取文件时返回 False 属于正常情况，不计为失败
+        _update_state(last_update=now, failure={"time": now, "mode": mode})
+    return ok
+
 
+def _update_wallpaper(force_refresh: bool, reporter: ProgressReporter, cancel_token: CancelToken | None,
+                      local_only: bool = False) -> bool:
+    from display import get_monitors
+
+    _report = reporter.phase
     ensure_dir()
     date_id = get_date_id()
+    monitors = get_monitors()
     if not force_refresh:
         is_today, cache = _is_cache_from_today()
-        if is_today:
+        # 轮播、从历史重新应用的单张图片照常保留；跨屏拼接图只在显示器布局未变时复用
+        if is_today and (not cache.get("span") or _layout_matches(cache, monitors)):
             # 自动模式：若已存在今日壁纸，直接复用即可视为成功
-            set_wallpaper(Path(cache["path"]))
+            CACHE_HITS.inc(cache="wallpaper")
+            set_wallpaper(Path(cache["path"]), span=bool(cache.get("span")))
+            if cache.get("preview") and not local_only:
+                # 上次渐进式应用的原图没来得及下载完（如进程已退出），在这里补上
+                try:
+                    _complete_progressive(cache, cancel_token, locked=True)
+                except UpdateCancelled:
+                    raise
+                except Exception:
+                    pass
+            return True
+        prefetched = _get_prefetched(date_id)
+        if prefetched and _layout_matches(prefetched, monitors) and _apply_prefetched(prefetched, monitors, date_id):
+            # 已预取今日壁纸：直接应用，不访问网络
+            CACHE_HITS.inc(cache="prefetch")
+            _report("done", 100)
             return True
+        CACHE_MISSES.inc(cache="wallpaper")
+        if local_only:
+            return False
     else:
         # 手动刷新时仅作为“回退信息”读取缓存，不应把旧壁纸当作成功结果
         _, cache = _is_cache_from_today()
 
     _report("fetching", 0)
-    images = fetch_images_from_commons(limit=500)
+    images = get_catalog(limit=500, cancel_token=cancel_token)
     if not images:
         # 网络或代理异常时：
         # - 自动模式：若有旧缓存，已经在前面直接复用并返回 True
         # - 手动刷新：此时应该明确返回 False，而不是用旧壁纸伪装“更新成功”
         if not force_refresh and cache and Path(cache.get("path", "")).exists():
-            set_wallpaper(Path(cache["path"]))
+            set_wallpaper(Path(cache["path"]), span=bool(cache.get("span")))
             return True
         return False
 
     _report("selecting", 15)
     select_id = date_id if not force_refresh else (date_id * 1000 + int(time.time()) % 1000)
-    selected = select_image(images, select_id)
+    if len(monitors) > 1:
+        # 多显示器：各屏图片并行下载，拼成一张跨屏图一次应用（不走渐进式预览）
+        from multimonitor import apply_span, download_for_monitors
+        _report("downloading", 15, until=85)
+        entry = download_for_monitors(images, monitors, select_id, _theme_preference(), cancel_token, reporter)
+        _check_cancel(cancel_token)
+        _report("setting", 90)
+        if entry and apply_span(entry, monitors, select_id):
+            _report("done", 100)
+            return True
+        _report("error", 0)
+        return False
+    selected = select_image(images, select_id, theme=_theme_preference())
     if not selected:
         _report("error", 0)
         return False
@@ -264,38 +1320,44 @@ def update_wallpaper(force_refresh: bool = False, progress_callback=None) -> boo
     filename = f"wallpaper_{select_id}{ext}"
     filepath = WALLPAPER_DIR / filename
 
-    def dl_progress(_, pct):
-        _report("downloading", 15 + int(pct * 70 / 100))
-    if not download_image(selected["url"], filepath, progress_callback=dl_progress):
+    if force_refresh and _progressive_enabled():
+        # 手动刷新：先应用小尺寸预览（约 1 秒），原图在后台下载、校验后原子替换
+        preview = _apply_preview(selected, filepath, select_id, reporter, cancel_token)
+        if preview:
+            _complete_progressive_in_background(preview)
+            return True
+
+    _report("downloading", 15, until=85)
+    if not download_image(selected["url"], filepath, cancel_token=cancel_token, reporter=reporter):
         _report("error", 0)
         return False
 
+    if cancel_token is not None and cancel_token.cancelled:
+        # 已下载但尚未应用：取消时不切换壁纸，也不留下孤立文件
+        _remove_quietly(filepath)
+        raise UpdateCancelled()
+
     _report("setting", 90)
     if set_wallpaper(filepath):
-        metadata = selected.get("metadata", {})
-        cache_data = {
-            "path": str(filepath),
-            "title": selected["title"],
-            "url": selected["url"],
-            "descriptionurl": selected.get("descriptionurl", ""),
-            "date": datetime.now().isoformat(),
-            "date_id": select_id,
-            "metadata": {
-                "title": metadata.get("title") or selected["title"],
-                "description": metadata.get("description", ""),
-                "artist": metadata.get("artist", ""),
-                "license": metadata.get("license", ""),
-                "credit": metadata.get("credit", ""),
-            }
-        }
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        _save_current(_cache_entry(selected, filepath, select_id))
         _report("done", 100)
         return True
     _report("error", 0)
     return False
 
 
+def commons_page_url(entry: dict, meta: dict = None) -> str:
+    """File page of a cache/history entry on Commons (the file itself for local-source entries)."""
+    commons_url = entry.get("descriptionurl") or (meta.get("descriptionurl") if isinstance(meta, dict) else "")
+    if not commons_url and entry.get("url", "").startswith("file:"):
+        # 本地目录图源没有 Commons 页面，指向原文件
+        commons_url = entry["url"]
+    if not commons_url and entry.get("title"):
+        fn = quote(entry["title"].replace(" ", "_"))
+        commons_url = f"https://commons.wikimedia.org/wiki/File:{fn}"
+    return commons_url
+
+
 def get_current_wallpaper_info() -> dict:
     if not CACHE_FILE.exists():
         return {}
@@ -307,10 +1369,7 @@ def get_current_wallpaper_info() -> dict:
     meta = cache.get("metadata", {})
     if not meta and cache.get("title"):
         meta = fetch_image_metadata(cache["title"])
-    commons_url = cache.get("descriptionurl") or (meta.get("descriptionurl") if isinstance(meta, dict) else "")
-    if not commons_url and cache.get("title"):
-        fn = quote(cache["title"].replace(" ", "_"))
-        commons_url = f"https://commons.wikimedia.org/wiki/File:{fn}"
+    commons_url = commons_page_url(cache, meta)
     return {
         "title": (meta or {}).get("title") or cache.get("title", ""),
         "description": (meta or {}).get("description", ""),
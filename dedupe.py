@@ -0,0 +1,108 @@
+"""Near-duplicate detection - cluster catalog entries by perceptual hash.
+
+Hashes come from analysis.py (ANALYSIS_FILE). All of them live in one uint64
+NumPy array; Hamming distances are computed block by block against the whole
+array, and pairs within DUP_MAX_DISTANCE are merged with union-find. Selection
+then treats each cluster as a single candidate.
+"""
+
+import threading
+
+from config import DUP_MAX_DISTANCE
+
+_BLOCK = 256  # 每次与整组比较的行数，峰值内存约 _BLOCK * N * 8 字节
+
+_index_lock = threading.Lock()
+_index = None
+
+
+def _popcount(x):
+    import numpy as np
+
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(x)
+    # 旧版 NumPy：按字节查表
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def _find(parent, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_hashes(hashes, max_distance: int = DUP_MAX_DISTANCE):
+    """Cluster label per hash (label = smallest member index) for a uint64 array."""
+    import numpy as np
+
+    n = len(hashes)
+    parent = list(range(n))
+    for start in range(0, n, _BLOCK):
+        block = hashes[start:start + _BLOCK]
+        # 只看上三角：每行与自身之后的条目比较
+        dist = _popcount(block[:, None] ^ hashes[None, start:])
+        rows, cols = np.nonzero(dist <= max_distance)
+        keep = cols > rows
+        for i, j in zip((rows[keep] + start).tolist(), (cols[keep] + start).tolist()):
+            ri, rj = _find(parent, i), _find(parent, j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+    return np.array([_find(parent, i) for i in range(n)], dtype=np.int64)
+
+
+class DedupeIndex:
+    """pageid -> cluster id for every analysed entry; built once per analysis snapshot."""
+
+    def __init__(self, analysis: dict, max_distance: int = DUP_MAX_DISTANCE):
+        import numpy as np
+
+        self.source = analysis
+        ids, hashes = [], []
+        for pageid, entry in analysis.items():
+            try:
+                hashes.append(int(entry["phash"], 16))
+                ids.append(int(pageid))
+            except (KeyError, TypeError, ValueError):
+                continue
+        order = np.argsort(np.array(ids, dtype=np.int64), kind="stable")
+        self.pageids = np.array(ids, dtype=np.int64)[order]
+        self.hashes = np.array(hashes, dtype=np.uint64)[order]
+        labels = cluster_hashes(self.hashes, max_distance)
+        # 以簇内最小 pageid 作为簇 id，结果与 analysis.json 的顺序无关
+        self._cluster = dict(zip(self.pageids.tolist(), self.pageids[labels].tolist()))
+
+    def cluster_of(self, pageid) -> int | None:
+        try:
+            return self._cluster.get(int(pageid))
+        except (TypeError, ValueError):
+            return None
+
+    def collapse(self, sorted_images: list[dict]) -> list[dict]:
+        """Keep the first entry of each cluster; unanalysed entries pass through."""
+        seen = set()
+        result = []
+        for im in sorted_images:
+            cluster = self.cluster_of(im.get("pageid"))
+            if cluster is not None:
+                if cluster in seen:
+                    continue
+                seen.add(cluster)
+            result.append(im)
+        return result
+
+
+def get_index() -> DedupeIndex | None:
+    """Index over the current analysis cache, rebuilt only after it changes."""
+    global _index
+    try:
+        import numpy  # noqa: F401
+        from analysis import load_analysis
+    except ImportError:
+        return None
+    analysis = load_analysis()
+    with _index_lock:
+        if _index is None or _index.source is not analysis:
+            _index = DedupeIndex(analysis)
+        return _index
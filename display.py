@@ -0,0 +1,124 @@
+"""Display geometry - screen and monitor sizes in physical pixels.
+
+"display_size" in config.json (e.g. "3440x1440") overrides detection, for
+platforms without it or to pick for another screen. "monitors" (e.g.
+["2560x1440+0+0", "1920x1080+2560+180"]) overrides the monitor layout;
+"multi_monitor": false applies one image to every monitor.
+"""
+
+import re
+import sys
+
+from config import MIN_HEIGHT, MIN_WIDTH
+
+
+def get_screen_size() -> tuple[int, int]:
+    """(width, height) of the primary screen; falls back to MIN_WIDTH x MIN_HEIGHT."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            user32, gdi32 = ctypes.windll.user32, ctypes.windll.gdi32
+            hdc = user32.GetDC(0)
+            try:
+                # DESKTOPHORZRES / DESKTOPVERTRES 不受 DPI 缩放影响，返回物理分辨率
+                width, height = gdi32.GetDeviceCaps(hdc, 118), gdi32.GetDeviceCaps(hdc, 117)
+            finally:
+                user32.ReleaseDC(0, hdc)
+            if width > 0 and height > 0:
+                return width, height
+        except Exception:
+            pass
+    return MIN_WIDTH, MIN_HEIGHT
+
+
+def _parse_size(value) -> tuple[int, int] | None:
+    try:
+        if isinstance(value, str):
+            value = value.lower().replace("×", "x").split("x")
+        width, height = (int(v) for v in value)
+    except (TypeError, ValueError):
+        return None
+    return (width, height) if width > 0 and height > 0 else None
+
+
+def get_display_size() -> tuple[int, int]:
+    """Size wallpapers are picked and fitted for: the config override, else get_screen_size()."""
+    from core import load_config
+
+    return _parse_size(load_config().get("display_size")) or get_screen_size()
+
+
+def _parse_monitor(value) -> tuple[int, int, int, int] | None:
+    """"WxH+X+Y" (X, Y may be negative: "1920x1080+-1920+0") or [x, y, w, h] -> (left, top, width, height)."""
+    if isinstance(value, str):
+        m = re.fullmatch(r"(\d+)x(\d+)(?:\+(-?\d+)\+(-?\d+))?", value.lower().replace("×", "x").replace(" ", ""))
+        if not m:
+            return None
+        value = (int(m[3] or 0), int(m[4] or 0), int(m[1]), int(m[2]))
+    try:
+        left, top, width, height = (int(v) for v in value)
+    except (TypeError, ValueError):
+        return None
+    return (left, top, width, height) if width > 0 and height > 0 else None
+
+
+def _enum_monitors_windows() -> list[tuple[bool, int, int, int, int]]:
+    import ctypes
+    from ctypes import wintypes
+
+    class MONITORINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.DWORD), ("rcMonitor", wintypes.RECT),
+                    ("rcWork", wintypes.RECT), ("dwFlags", wintypes.DWORD)]
+
+    user32 = ctypes.windll.user32
+    found = []
+
+    def on_monitor(hmonitor, hdc, rect, lparam):
+        info = MONITORINFO()
+        info.cbSize = ctypes.sizeof(MONITORINFO)
+        if user32.GetMonitorInfoW(hmonitor, ctypes.byref(info)):
+            r = info.rcMonitor
+            found.append((bool(info.dwFlags & 1), r.left, r.top, r.right - r.left, r.bottom - r.top))
+        return True
+
+    callback = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HMONITOR, wintypes.HDC,
+                                  ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)(on_monitor)
+    previous = None
+    try:
+        # 临时切换为按显示器感知 DPI（Windows 10 1607+），坐标才是各显示器的物理像素
+        user32.SetThreadDpiAwarenessContext.restype = ctypes.c_void_p
+        user32.SetThreadDpiAwarenessContext.argtypes = [ctypes.c_void_p]
+        previous = user32.SetThreadDpiAwarenessContext(ctypes.c_void_p(-4))
+    except AttributeError:
+        pass
+    try:
+        user32.EnumDisplayMonitors(None, None, callback, 0)
+    finally:
+        if previous:
+            user32.SetThreadDpiAwarenessContext(previous)
+    return found
+
+
+def get_monitors() -> list[tuple[int, int, int, int]]:
+    """(left, top, width, height) of each monitor in desktop coordinates, primary first.
+
+    单显示器、未能检测或 "multi_monitor": false 时只返回一项，尺寸为 get_display_size()。
+    """
+    from core import load_config
+
+    cfg = load_config()
+    if cfg.get("multi_monitor", True) is not False:
+        configured = cfg.get("monitors")
+        if isinstance(configured, list):
+            monitors = [m for m in (_parse_monitor(v) for v in configured) if m]
+            if monitors:
+                return monitors
+        elif sys.platform == "win32" and not cfg.get("display_size"):
+            try:
+                found = _enum_monitors_windows()
+            except Exception:
+                found = []
+            if len(found) > 1:
+                found.sort(key=lambda m: (not m[0], m[1], m[2]))
+                return [m[1:] for m in found]
+    return [(0, 0, *get_display_size())]
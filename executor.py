@@ -0,0 +1,80 @@
+"""Task executor - one bounded, prioritized worker pool shared by both tray backends."""
+
+import heapq
+import itertools
+import threading
+
+PRIORITY_CONTROL = 0  # 退出等控制命令
+PRIORITY_UI = 1  # 菜单点击：进度对话框、消息框
+PRIORITY_BACKGROUND = 2  # IPC 转交的更新 / 预取
+
+
+class TaskExecutor:
+    """Run callables on at most max_workers threads, lowest priority value first.
+
+    - 线程按需创建，之后常驻；空闲时阻塞在 Condition.wait() 上，没有超时轮询；
+    - 带 key 的任务在排队或执行期间重复提交会被忽略（如连续点击同一菜单项）；
+    - shutdown() 丢弃排队中的任务并唤醒所有空闲线程退出。
+    """
+
+    def __init__(self, max_workers: int = 6, name: str = "TrayTask"):
+        self._max_workers = max(1, max_workers)
+        self._name = name
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._keys = set()
+        self._threads = []
+        self._idle = 0
+        self._closed = False
+
+    def submit(self, fn, *args, key: str = None, priority: int = PRIORITY_UI) -> bool:
+        """Queue fn(*args); False when shut down or a task with the same key is pending."""
+        with self._cond:
+            if self._closed or (key is not None and key in self._keys):
+                return False
+            if key is not None:
+                self._keys.add(key)
+            heapq.heappush(self._heap, (priority, next(self._seq), key, fn, args))
+            # 已唤醒但尚未取走任务的线程仍计入 _idle，因此用“待处理数 > 空闲数”判断是否需要新线程
+            if len(self._heap) > self._idle and len(self._threads) < self._max_workers:
+                thread = threading.Thread(target=self._work, name=f"{self._name}-{len(self._threads) + 1}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return True
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._idle += 1
+                    try:
+                        self._cond.wait()
+                    finally:
+                        self._idle -= 1
+                if self._closed:
+                    return
+                _, _, key, fn, args = heapq.heappop(self._heap)
+            try:
+                fn(*args)
+            except Exception:
+                pass
+            finally:
+                if key is not None:
+                    with self._cond:
+                        self._keys.discard(key)
+
+    def shutdown(self, wait: bool = False, timeout: float = None):
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._keys.clear()
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            current = threading.current_thread()
+            for thread in threads:
+                if thread is not current:
+                    thread.join(timeout)
@@ -0,0 +1,200 @@
+"""History - past wallpapers and their thumbnail sprite sheet.
+
+Every applied wallpaper is recorded in HISTORY_FILE (core._save_current).
+Thumbnails are rendered once into fixed-size cells of a single JPEG sprite
+sheet (SPRITE_FILE); SPRITE_INDEX_FILE maps each history entry to its cell.
+update_sprites() only decodes entries that have no cell yet, so the history
+view loads one small image instead of decoding the originals.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from config import (
+    LOCK_FILE,
+    LOCK_TIMEOUT,
+    SPRITE_CELL,
+    SPRITE_COLUMNS,
+    SPRITE_FILE,
+    SPRITE_INDEX_FILE,
+    WALLPAPER_DIR,
+)
+from core import (
+    CancelToken,
+    _check_cancel,
+    _save_current,
+    _write_json_atomic,
+    download_image,
+    ensure_dir,
+    get_file_extension,
+    load_history,
+    set_wallpaper,
+)
+
+_sprite_lock = threading.Lock()
+
+
+def sprite_key(entry: dict) -> str:
+    # 按 url 而不是路径：预览图换成原图、文件被归档后仍复用同一格
+    return hashlib.sha1(entry.get("url", "").encode("utf-8")).hexdigest()[:16]
+
+
+def _load_index() -> dict:
+    """Sprite index: "slots" maps sprite_key to a cell, "failed" lists keys whose image would not decode."""
+    index = {"cell": list(SPRITE_CELL), "columns": SPRITE_COLUMNS, "slots": {}, "failed": []}
+    try:
+        with open(SPRITE_INDEX_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return index
+    if isinstance(data, dict) and data.get("cell") == list(SPRITE_CELL):
+        if SPRITE_FILE.exists():
+            return dict(index, **data)
+        # 精灵图丢失：格子全部作废，但解码失败的记录仍然有效
+        index["failed"] = list(data.get("failed") or [])
+    return index
+
+
+def _thumbnail_source(entry: dict) -> Path | None:
+    """The entry's image if still on disk: the file, the pending full image, or its archived copy."""
+    from archive import archived_path
+
+    for value in (entry.get("path"), entry.get("full_path")):
+        if value and Path(value).is_file():
+            return Path(value)
+    return archived_path(entry.get("path", "")) if entry.get("path") else None
+
+
+def _render_cell(path: Path):
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as img:
+        # JPEG 在解码时即按比例缩小，数 MB 的原图也只需解码一小部分
+        img.draft("RGB", (SPRITE_CELL[0] * 2, SPRITE_CELL[1] * 2))
+        return ImageOps.fit(img.convert("RGB"), SPRITE_CELL, Image.Resampling.LANCZOS)
+
+
+def cell_box(index: dict, slot: int) -> tuple[int, int, int, int]:
+    width, height = index["cell"]
+    columns = index["columns"]
+    x, y = (slot % columns) * width, (slot // columns) * height
+    return x, y, x + width, y + height
+
+
+def update_sprites(history: list[dict] = None, cancel_token: CancelToken | None = None) -> dict:
+    """Add cells for history entries that have none; returns the sprite index.
+
+    已不在历史中的条目所占的格子会被新条目复用，精灵图不会无限增长。
+    """
+    from PIL import Image
+
+    history = load_history() if history is None else history
+    with _sprite_lock:
+        index = _load_index()
+        slots = index["slots"]
+        live = {sprite_key(e) for e in history}
+        failed = set(index["failed"]) & live
+        todo = [e for e in history if sprite_key(e) not in slots and sprite_key(e) not in failed]
+        if not todo:
+            return index
+        known_failed = set(failed)
+        rendered = {}
+        for entry in todo:
+            _check_cancel(cancel_token)
+            source = _thumbnail_source(entry)
+            if source is None:
+                continue
+            try:
+                rendered[sprite_key(entry)] = _render_cell(source)
+            except Exception:
+                # Pillow 无法解码：记下来，之后的检查不再反复打开、解码这个文件
+                failed.add(sprite_key(entry))
+        index["failed"] = sorted(failed)
+        if not rendered:
+            if failed != known_failed:
+                ensure_dir()
+                _write_json_atomic(SPRITE_INDEX_FILE, index)
+            return index
+
+        free = sorted(slot for key, slot in slots.items() if key not in live)
+        for key in [k for k in slots if k not in live]:
+            del slots[key]
+        used = set(slots.values())
+        next_slot = max(used | set(free), default=-1) + 1
+        for key in rendered:
+            if free:
+                slots[key] = free.pop(0)
+            else:
+                slots[key] = next_slot
+                next_slot += 1
+        rows = (max(slots.values()) // index["columns"]) + 1
+        size = (index["columns"] * SPRITE_CELL[0], rows * SPRITE_CELL[1])
+        sheet = Image.new("RGB", size, (32, 32, 32))
+        if SPRITE_FILE.exists():
+            try:
+                with Image.open(SPRITE_FILE) as old:
+                    sheet.paste(old.convert("RGB").crop((0, 0, min(old.width, size[0]), min(old.height, size[1]))))
+            except Exception:
+                # 精灵图损坏：丢弃所有旧格子，下次全部重建
+                index["slots"] = {key: slots[key] for key in rendered}
+        for key, cell in rendered.items():
+            sheet.paste(cell, cell_box(index, slots[key])[:2])
+        ensure_dir()
+        part = SPRITE_FILE.with_name(SPRITE_FILE.name + ".part")
+        sheet.save(part, format="JPEG", quality=88)
+        part.replace(SPRITE_FILE)
+        _write_json_atomic(SPRITE_INDEX_FILE, index)
+        return index
+
+
+def load_sprites(history: list[dict] = None) -> tuple[dict, "Image.Image | None"]:
+    """(sprite index, decoded sprite sheet or None), after adding any missing cells."""
+    from PIL import Image
+
+    index = update_sprites(history)
+    if not index["slots"]:
+        return index, None
+    try:
+        with Image.open(SPRITE_FILE) as sheet:
+            sheet.load()
+            return index, sheet.copy()
+    except Exception:
+        return index, None
+
+
+def reapply(entry: dict, cancel_token: CancelToken | None = None) -> bool:
+    """Apply a history entry again; downloads the original if the file is gone."""
+    from coordinator import InterProcessLock
+
+    target = _thumbnail_source(entry)
+    # 多显示器拼接图只有原文件还在时才按跨屏应用；重新下载的是主显示器那张原图
+    span = bool(entry.get("span")) and target is not None and str(target) == entry.get("path")
+    if target is None or target.suffix.lower() == ".webp" or entry.get("preview"):
+        # 原图已删除、只剩归档副本（WebP 不一定能设为壁纸）或只有预览图：按 url 重新下载原图，
+        # 下载失败时退回现有文件
+        name = Path(entry.get("path") or "history").stem.removesuffix("_preview").removesuffix("_span")
+        if not name.startswith("wallpaper_"):
+            name = f"wallpaper_{name}"
+        download_path = WALLPAPER_DIR / f"{name}{get_file_extension(entry['url'])}"
+        if download_path.is_file() or download_image(entry["url"], download_path, cancel_token=cancel_token):
+            target = download_path
+    if target is None:
+        return False
+
+    lock = InterProcessLock(LOCK_FILE)
+    if not lock.acquire(timeout=LOCK_TIMEOUT, cancel_token=cancel_token):
+        return False
+    try:
+        _check_cancel(cancel_token)
+        if not set_wallpaper(target, span=span):
+            return False
+        dropped = ("preview", "full_path") if span else ("preview", "full_path", "fitted", "span", "layout", "monitors")
+        applied = {k: v for k, v in entry.items() if k not in dropped}
+        applied.update(path=str(target), date=datetime.now().isoformat())
+        _save_current(applied)
+        return True
+    finally:
+        lock.release()
@@ -0,0 +1,168 @@
+"""HTTP cache - on-disk cache for api.php JSON responses, with revalidation.
+
+Entries are keyed by the normalized query (parameters sorted) and keep the
+parsed body, ETag / Last-Modified and the response's max-age. Fresh entries
+are served without a request; stale ones are revalidated with If-None-Match /
+If-Modified-Since and a 304 only refreshes the entry. Within "http_cache_swr"
+seconds (config.json) past max-age the cached body is returned at once and
+revalidated in the background; when the network fails, a stale body is
+better than none. "http_cache": false turns the cache off.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from urllib.request import Request
+
+from config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_FILES, HTTP_CACHE_SWR
+from core import CancelToken, _remove_quietly, _write_json_atomic, ensure_dir, load_config
+from metrics import CACHE_HITS, CACHE_MISSES
+
+_refresh_lock = threading.Lock()
+_refreshing = set()
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.scheme}://{parts.netloc.lower()}{parts.path}?{query}"
+
+
+def _entry_path(key: str):
+    return HTTP_CACHE_DIR / f"{key}.json"
+
+
+def _load(key: str) -> dict | None:
+    try:
+        with open(_entry_path(key), encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry if isinstance(entry, dict) and "data" in entry else None
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_control(headers) -> tuple[float, bool]:
+    """(max-age seconds, no-store) from Cache-Control."""
+    max_age, no_store = 0.0, False
+    for directive in (headers.get("Cache-Control") or "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "no-store":
+            no_store = True
+        elif name in ("max-age", "s-maxage"):
+            try:
+                max_age = max(max_age, float(value.strip('"')))
+            except ValueError:
+                pass
+    return max_age, no_store
+
+
+def _prune():
+    files = sorted(HTTP_CACHE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in files[HTTP_CACHE_MAX_FILES:]:
+        _remove_quietly(old)
+
+
+def _store(key: str, url: str, data, headers, previous: dict = None):
+    max_age, no_store = _cache_control(headers)
+    if no_store:
+        _remove_quietly(_entry_path(key))
+        return
+    previous = previous or {}
+    entry = {
+        "url": url,
+        "stored": time.time(),
+        "max_age": max_age,
+        # 304 响应可能不带校验值，沿用原记录的
+        "etag": headers.get("ETag") or previous.get("etag"),
+        "last_modified": headers.get("Last-Modified") or previous.get("last_modified"),
+        "data": data,
+    }
+    try:
+        ensure_dir()
+        HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(_entry_path(key), entry)
+        _prune()
+    except OSError:
+        pass
+
+
+def _conditional(req: Request, entry: dict | None) -> Request:
+    headers = dict(req.header_items())
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return Request(req.full_url, headers=headers)
+
+
+def _revalidate(key: str, req: Request, entry: dict | None, fetch, cancel_token: CancelToken | None = None,
+                retries: int = None):
+    kwargs = {} if retries is None else {"retries": retries}
+    result = fetch(_conditional(req, entry), cancel_token, **kwargs)
+    if result is None:
+        return None
+    data, headers = result
+    if data is None:
+        if entry is None:
+            return None
+        CACHE_HITS.inc(cache="http_revalidated")
+        _store(key, entry["url"], entry["data"], headers, entry)
+        return entry["data"]
+    _store(key, req.full_url, data, headers, entry)
+    return data
+
+
+def _revalidate_in_background(key: str, req: Request, entry: dict, fetch):
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _revalidate(key, req, entry, fetch, retries=1)
+        except Exception:
+            pass
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name="HttpRevalidateThread", daemon=True).start()
+
+
+def _settings() -> tuple[bool, float]:
+    cfg = load_config()
+    try:
+        swr = float(cfg.get("http_cache_swr", HTTP_CACHE_SWR))
+    except (TypeError, ValueError):
+        swr = HTTP_CACHE_SWR
+    return cfg.get("http_cache", True) is not False, max(0.0, swr)
+
+
+def cached_fetch(req: Request, fetch, cancel_token: CancelToken | None = None):
+    """JSON for req via the cache; fetch(req, cancel_token) returns (data, headers), data None on 304."""
+    enabled, swr = _settings()
+    if not enabled:
+        result = fetch(req, cancel_token)
+        return result[0] if result else None
+    key = hashlib.sha1(normalize_url(req.full_url).encode("utf-8")).hexdigest()
+    entry = _load(key)
+    if entry:
+        age = time.time() - float(entry.get("stored") or 0)
+        max_age = float(entry.get("max_age") or 0)
+        if 0 <= age < max_age:
+            CACHE_HITS.inc(cache="http")
+            return entry["data"]
+        if 0 <= age < max_age + swr:
+            # stale-while-revalidate：本次直接用缓存，刷新在后台进行
+            CACHE_HITS.inc(cache="http_stale")
+            _revalidate_in_background(key, req, entry, fetch)
+            return entry["data"]
+    CACHE_MISSES.inc(cache="http")
+    data = _revalidate(key, req, entry, fetch, cancel_token)
+    if data is None and entry:
+        # 网络不可用：过期的缓存也比没有好（stale-if-error）
+        return entry["data"]
+    return data
@@ -0,0 +1,132 @@
+"""Single-instance IPC - later launches hand their command to the running tray.
+
+The tray listens on loopback and records port + token in INSTANCE_FILE; keep this
+module cheap to import (stdlib and config only), it runs before anything else.
+"""
+
+import json
+import os
+import secrets
+import socket
+import threading
+
+from config import INSTANCE_FILE
+
+COMMANDS = ("ping", "refresh", "status", "prefetch", "quit")
+_MAX_LINE = 64 * 1024
+
+
+def _read_instance() -> dict:
+    try:
+        with open(INSTANCE_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _recv_line(conn: socket.socket) -> bytes:
+    buf = b""
+    while b"\n" not in buf and len(buf) < _MAX_LINE:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        buf += chunk
+    return buf.split(b"\n", 1)[0]
+
+
+def send_command(cmd: str, args: dict = None, timeout: float = 2.0) -> dict | None:
+    """Send cmd to the running tray; None when no instance answers."""
+    info = _read_instance()
+    port, token = info.get("port"), info.get("token")
+    if not port or not token:
+        return None
+    request = {"token": token, "cmd": cmd, "args": args or {}}
+    try:
+        with socket.create_connection(("127.0.0.1", int(port)), timeout=timeout) as conn:
+            conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = _recv_line(conn)
+        reply = json.loads(line.decode("utf-8")) if line else None
+        return reply if isinstance(reply, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+class IpcServer:
+    """Loopback command server owned by the tray process.
+
+    handlers 映射命令名到 fn(args) -> dict；处理函数应快速返回，耗时任务
+    自行放到后台执行。accept() 阻塞等待，没有轮询。
+    """
+
+    def __init__(self, handlers: dict):
+        self._handlers = handlers
+        self._token = secrets.token_hex(16)
+        self._sock = None
+        self._thread = None
+
+    def start(self) -> bool:
+        from core import _write_json_atomic, ensure_dir
+
+        ensure_dir()
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            sock.listen(8)
+        except OSError:
+            return False
+        self._sock = sock
+        _write_json_atomic(INSTANCE_FILE, {
+            "port": sock.getsockname()[1],
+            "token": self._token,
+            "pid": os.getpid(),
+        })
+        self._thread = threading.Thread(target=self._serve, args=(sock,), name="IpcServerThread", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        try:
+            # shutdown() 先唤醒阻塞中的 accept()，再关闭
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        if _read_instance().get("token") == self._token:
+            try:
+                INSTANCE_FILE.unlink()
+            except OSError:
+                pass
+
+    def _serve(self, sock: socket.socket):
+        while self._sock is sock:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            with conn:
+                conn.settimeout(2.0)
+                try:
+                    self._handle(conn)
+                except (OSError, ValueError):
+                    pass
+
+    def _handle(self, conn: socket.socket):
+        line = _recv_line(conn)
+        request = json.loads(line.decode("utf-8")) if line else {}
+        if not secrets.compare_digest(str(request.get("token", "")), self._token):
+            reply = {"ok": False, "error": "unauthorized"}
+        else:
+            cmd = request.get("cmd")
+            handler = self._handlers.get(cmd)
+            if handler is None:
+                reply = {"ok": False, "error": f"unknown command: {cmd}"}
+            else:
+                try:
+                    reply = handler(request.get("args") or {})
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+        conn.sendall(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
@@ -0,0 +1,163 @@
+"""Metrics - in-process counters and histograms, served as Prometheus text (opt-in).
+
+Recording is a lock plus an add, cheap enough for the download and API paths.
+The tray serves /metrics on localhost when "metrics_port" is set in config.json
+("metrics_bind" changes the address). Stdlib only.
+"""
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_registry = []
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def export(self) -> list:
+        with self._lock:
+            return [[list(key), v] for key, v in self._values.items()]
+
+    def merge(self, values: list):
+        for key, v in values:
+            self.inc(float(v), **dict(zip(self.labels, key)))
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 最后一格为 +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def export(self) -> dict:
+        with self._lock:
+            return {"counts": list(self._counts), "sum": self._sum}
+
+    def merge(self, values: dict):
+        counts = [int(n) for n in values["counts"]]
+        if len(counts) != len(self._counts):
+            return
+        with self._lock:
+            self._counts = [a + b for a, b in zip(self._counts, counts)]
+            self._sum += float(values["sum"])
+
+    def render(self) -> list[str]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            lines.append(f'{self.name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+UPDATES = Counter("dcw_updates_total", "Wallpaper updates by mode and result.", ("mode", "result"))
+CACHE_HITS = Counter("dcw_cache_hits_total", "Requests served from a local cache.", ("cache",))
+CACHE_MISSES = Counter("dcw_cache_misses_total", "Requests that needed the network.", ("cache",))
+API_REQUESTS = Counter("dcw_api_requests_total", "Commons API attempts by result.", ("result",))
+API_RETRIES = Counter("dcw_api_retries_total", "Commons API attempts retried after an error.")
+API_HEDGES = Counter("dcw_api_hedges_total", "Hedged Commons API requests by which request won.", ("winner",))
+DOWNLOAD_BYTES = Counter("dcw_download_bytes_total", "Bytes of completed image downloads.", ("source",))
+DOWNLOAD_RETRIES = Counter("dcw_download_retries_total", "Image download attempts retried after an error.")
+SCHEDULER_RUNS = Counter("dcw_scheduler_runs_total", "Tray scheduler tasks run.", ("task",))
+
+API_LATENCY = Histogram("dcw_api_latency_seconds", "Commons API request latency.",
+                        (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+DOWNLOAD_THROUGHPUT = Histogram("dcw_download_throughput_bytes_per_second", "Image download throughput.",
+                                (64e3, 256e3, 1e6, 4e6, 16e6, 64e6))
+APPLY_SECONDS = Histogram("dcw_apply_seconds", "Time to set the desktop wallpaper.",
+                          (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+
+def export() -> dict:
+    """Everything recorded in this process, as JSON-compatible values by metric name."""
+    return {metric.name: metric.export() for metric in list(_registry)}
+
+
+def merge(values: dict):
+    """Add values from export() in another process (a worker) to this registry."""
+    by_name = {metric.name: metric for metric in list(_registry)}
+    for name, value in values.items():
+        metric = by_name.get(name)
+        if metric is None:
+            continue
+        try:
+            metric.merge(value)
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_registry):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(port: int, bind: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    """Serve /metrics from a daemon thread; None if the port cannot be bound."""
+    try:
+        server = ThreadingHTTPServer((bind, port), _MetricsHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServerThread", daemon=True).start()
+    return server
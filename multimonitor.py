@@ -0,0 +1,118 @@
+"""Multi-monitor - a different wallpaper on every monitor, applied in one step.
+
+core.select_images() derives one distinct pick per monitor from the date
+seed. The picks are downloaded and later fitted to their monitor's size in
+parallel threads (network I/O and Pillow's decoder / resampler both run
+outside the GIL), pasted into one image covering the virtual desktop and
+applied once in "span" style. Every monitor changes at the same moment, and
+a three-monitor update takes about as long as its slowest download.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from config import WALLPAPER_DIR
+from core import (
+    CancelToken,
+    _cache_entry,
+    _check_cancel,
+    _remove_quietly,
+    _save_current,
+    _verify_image,
+    download_image,
+    get_file_extension,
+    select_images,
+    set_wallpaper,
+)
+from progress import ProgressReporter
+
+
+def monitor_paths(picks: list[dict], select_id: int) -> list[Path]:
+    """Download targets; the primary keeps the single-monitor name, so a prefetched file is reused."""
+    return [WALLPAPER_DIR / f"wallpaper_{select_id}{'' if i == 0 else f'_{i}'}{get_file_extension(pick['url'])}"
+            for i, pick in enumerate(picks)]
+
+
+def _fetch_all(picks: list[dict], paths: list[Path], cancel_token: CancelToken | None = None,
+               reporter: ProgressReporter | None = None) -> list[bool]:
+    """Download every pick not on disk yet, concurrently; per pick whether a valid image is there."""
+    def fetch(i: int) -> bool:
+        # 字节进度只跟踪主显示器那张，几张图并行下载时进度条不会来回跳
+        if not paths[i].exists() and not download_image(picks[i]["url"], paths[i], cancel_token=cancel_token,
+                                                        reporter=reporter if i == 0 else None):
+            return False
+        if not _verify_image(paths[i]):
+            # 截断或不是图片（如错误页）：删除，拼接时不会在 Pillow 中出错，下次重新下载
+            _remove_quietly(paths[i])
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=len(picks), thread_name_prefix="MonitorThread") as pool:
+        return list(pool.map(fetch, range(len(picks))))
+
+
+def download_for_monitors(images: list[dict], monitors: list[tuple[int, int, int, int]], select_id: int,
+                          theme: str = None, cancel_token: CancelToken | None = None,
+                          reporter: ProgressReporter | None = None, require_all: bool = False) -> dict | None:
+    """Pick and download one image per monitor; the first pick's cache entry plus "layout" and "monitors".
+
+    某块屏幕的图片下载失败时用已下载的另一张顶上，不让整次更新失败；
+    require_all=True（预取）时则返回 None，留待下次重试。
+    """
+    picks = select_images(images, select_id, theme, monitors)
+    if not picks:
+        return None
+    paths = monitor_paths(picks, select_id)
+    ok = _fetch_all(picks, paths, cancel_token, reporter)
+    _check_cancel(cancel_token)
+    if not any(ok) or (require_all and not all(ok)):
+        return None
+    first = ok.index(True)
+    entry = _cache_entry(picks[first], paths[first], select_id)
+    entry["layout"] = [list(m) for m in monitors]
+    entry["monitors"] = [
+        {"path": str(path), "title": pick["title"], "url": pick["url"], "descriptionurl": pick.get("descriptionurl", "")}
+        for pick, path in ((p, q) if good else (picks[first], paths[first]) for p, q, good in zip(picks, paths, ok))
+    ]
+    return entry
+
+
+def compose_span(sources: list[Path], monitors: list[tuple[int, int, int, int]], dest: Path) -> Path:
+    """Fit each source to its monitor and paste it at the monitor's offset in one virtual-desktop image."""
+    from PIL import Image
+
+    from slideshow import fit_image
+
+    left = min(m[0] for m in monitors)
+    top = min(m[1] for m in monitors)
+    right = max(m[0] + m[2] for m in monitors)
+    bottom = max(m[1] + m[3] for m in monitors)
+    with ThreadPoolExecutor(max_workers=len(monitors), thread_name_prefix="MonitorThread") as pool:
+        fitted = list(pool.map(lambda job: fit_image(job[0], job[1][2:]), zip(sources, monitors)))
+    # 跨屏模式下图片铺在所有显示器的外接矩形上；显示器之间的空隙填黑色
+    canvas = Image.new("RGB", (right - left, bottom - top))
+    for image, (x, y, _, _) in zip(fitted, monitors):
+        canvas.paste(image, (x - left, y - top))
+    part = dest.with_name(dest.name + ".part")
+    canvas.save(part, format="JPEG", quality=92)
+    os.replace(part, dest)
+    return dest
+
+
+def apply_span(entry: dict, monitors: list[tuple[int, int, int, int]], select_id: int) -> bool:
+    """Compose entry's per-monitor images and apply them as one spanned wallpaper."""
+    sources = [Path(m.get("path", "")) for m in entry.get("monitors") or []]
+    if len(sources) != len(monitors) or not all(p.is_file() for p in sources):
+        return False
+    try:
+        span_path = compose_span(sources, monitors, WALLPAPER_DIR / f"wallpaper_{select_id}_span.jpg")
+    except Exception:
+        # 文件在校验后被改坏、磁盘已满等：本次失败，不让异常穿过更新流程
+        return False
+    if not set_wallpaper(span_path, span=True):
+        return False
+    # 拼接图是裁剪后的副本（fitted），peer.py 不会把它当作原图提供
+    _save_current(dict(entry, path=str(span_path), span=True, fitted=True, date=datetime.now().isoformat()))
+    return True
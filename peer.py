@@ -0,0 +1,163 @@
+"""LAN peer cache - serve the catalog and wallpapers to other desktops (--serve-cache).
+
+One machine per site runs `wallpaper.py --serve-cache`; the others set
+"peer_url" in config.json. Each image is fetched from Commons once per site
+and then served from PEER_CACHE_DIR.
+"""
+
+import gzip
+import hashlib
+import json
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from config import CACHE_FILE, PEER_CACHE_DIR, PEER_CACHE_MAX_FILES, PEER_PORT
+from core import _load_prefetch, download_image, ensure_dir, get_catalog, get_file_extension, is_commons_upload
+from version import __version__
+
+# 每个正在下载的 url 一把锁及其等待者数；最后一个使用者离开时删除，字典不会随 url 增长
+_url_locks = {}
+_url_locks_guard = threading.Lock()
+
+
+def _is_allowed(url: str) -> bool:
+    # 只代理 Commons 的原图地址，避免成为开放代理
+    return is_commons_upload(url)
+
+
+def _cache_path(url: str) -> Path:
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return PEER_CACHE_DIR / f"{digest}{get_file_extension(url)}"
+
+
+def _local_copy(url: str) -> Path | None:
+    """A wallpaper this machine already downloaded for itself, if any."""
+    entries = list(_load_prefetch().values())
+    try:
+        with open(CACHE_FILE, encoding="utf-8") as f:
+            entries.append(json.load(f))
+    except (OSError, ValueError):
+        pass
+    for entry in entries:
+        # 轮播图（裁剪副本）与渐进式应用的预览图都不能当作原图
+        if isinstance(entry, dict) and entry.get("url") == url and not (entry.get("fitted") or entry.get("preview")):
+            path = Path(entry.get("path", ""))
+            if path.is_file():
+                return path
+    return None
+
+
+def _prune_cache():
+    files = sorted(
+        (p for p in PEER_CACHE_DIR.iterdir() if p.is_file() and not p.name.endswith(".part")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old in files[PEER_CACHE_MAX_FILES:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def get_image_file(url: str) -> Path | None:
+    """Return a local file for url, downloading it once even under concurrent requests."""
+    local = _local_copy(url)
+    if local:
+        return local
+    path = _cache_path(url)
+    with _url_locks_guard:
+        slot = _url_locks.setdefault(url, [threading.Lock(), 0])
+        slot[1] += 1
+    try:
+        with slot[0]:
+            if path.is_file():
+                return path
+            PEER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            if not download_image(url, path, use_peer=False):
+                return None
+    finally:
+        with _url_locks_guard:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del _url_locks[url]
+    _prune_cache()
+    return path
+
+
+class _PeerHandler(BaseHTTPRequestHandler):
+    server_version = f"DailyCommonsPeer/{__version__}"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        gzipped = len(body) > 1024 and "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=6)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path == "/health":
+            self._send_json(200, {"ok": True, "version": __version__})
+        elif parsed.path == "/catalog":
+            try:
+                limit = max(1, min(500, int(query.get("limit", ["500"])[0])))
+            except ValueError:
+                limit = 500
+            # 只提供 Commons 条目；本地目录图源的 file:// 地址对其他机器无意义
+            images = [im for im in get_catalog(limit=limit, use_peer=False) if _is_allowed(im.get("url", ""))]
+            self._send_json(200 if images else 503, {"images": images})
+        elif parsed.path == "/image":
+            url = query.get("url", [""])[0]
+            if not _is_allowed(url):
+                self._send_json(403, {"error": "url not allowed"})
+                return
+            path = get_image_file(url)
+            if path is None:
+                self._send_json(502, {"error": "upstream download failed"})
+                return
+            self._send_file(path)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _send_file(self, path: Path):
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self._send_json(404, {"error": "not found"})
+            return
+        with f:
+            size = path.stat().st_size
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, 256 * 1024)
+
+
+def serve_cache(bind: str = "0.0.0.0", port: int = PEER_PORT):
+    """Run the peer cache HTTP server until interrupted."""
+    ensure_dir()
+    PEER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    server = ThreadingHTTPServer((bind, port), _PeerHandler)
+    server.daemon_threads = True
+    print(f"Serving wallpaper cache on http://{bind}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
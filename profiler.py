@@ -0,0 +1,86 @@
+"""Profiling - run one update under cProfile and tracemalloc and write a report.
+
+Used by `wallpaper.py --once --profile` and the tray's debug menu so field
+reports come with data, also from the frozen build. Reports go to PROFILES_DIR:
+a readable .txt (hotspots, allocation sites, peak memory) plus the raw .prof
+for snakeviz / pstats.
+"""
+
+import cProfile
+import io
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from config import PROFILE_KEEP, PROFILES_DIR
+from version import __version__
+
+_TOP_FUNCTIONS = 40
+_TOP_ALLOCATIONS = 25
+
+
+def _prune_profiles():
+    reports = sorted(PROFILES_DIR.glob("update_*.txt"), reverse=True)
+    for old in reports[PROFILE_KEEP:]:
+        for path in (old, old.with_suffix(".prof")):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def profile_update(force_refresh: bool = True) -> Path:
+    """Run coordinated_update() profiled; returns the path of the text report.
+
+    cProfile 只记录调用线程；后台线程（分段下载、原图替换）计入 wait 时间，
+    因此这里会等待后台替换完成，让墙钟时间和内存峰值覆盖完整的更新。
+    """
+    from coordinator import coordinated_update
+    from core import ensure_dir, wait_for_pending_swaps
+
+    ensure_dir()
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILES_DIR / f"update_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    tracemalloc.start(10)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        ok = coordinated_update(force_refresh=force_refresh)
+        wait_for_pending_swaps()
+    except Exception as e:
+        ok = f"error: {e!r}"
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    profiler.dump_stats(str(stem.with_suffix(".prof")))
+    out = io.StringIO()
+    out.write(f"Daily Commons Wallpaper {__version__} update profile\n")
+    out.write(f"date: {datetime.now().isoformat(timespec='seconds')}\n")
+    out.write(f"python: {sys.version.split()[0]} ({platform.platform()}), frozen: {getattr(sys, 'frozen', False)}\n")
+    out.write(f"force_refresh: {force_refresh}, result: {ok}\n")
+    out.write(f"wall time: {elapsed:.3f} s\n")
+    out.write(f"traced memory: current {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB\n")
+
+    for sort_key in ("cumulative", "tottime"):
+        out.write(f"\n== Hotspots by {sort_key} ==\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats(sort_key).print_stats(_TOP_FUNCTIONS)
+
+    out.write(f"\n== Top {_TOP_ALLOCATIONS} allocation sites (live at end) ==\n")
+    for stat in snapshot.statistics("lineno")[:_TOP_ALLOCATIONS]:
+        out.write(f"{stat}\n")
+
+    report = stem.with_suffix(".txt")
+    report.write_text(out.getvalue(), encoding="utf-8")
+    _prune_profiles()
+    return report
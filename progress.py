@@ -0,0 +1,132 @@
+"""Progress reporting - coalesced events with transfer rate and ETA."""
+
+import threading
+import time
+from dataclasses import dataclass
+
+# 界面刷新频率上限：无论下载多少个分块，每秒最多派发这么多事件
+DEFAULT_FPS = 10.0
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    phase: str
+    percent: int | None = None
+    bytes_done: int = 0
+    bytes_total: int = 0
+    rate: float = 0.0  # bytes/s, smoothed
+    eta: float | None = None  # seconds remaining, None when unknown
+
+
+class ProgressReporter:
+    """Turn per-chunk progress into at most `fps` structured events per second.
+
+    Phase changes are always delivered immediately; byte counts reported through
+    transfer() are coalesced to the frame rate, with an exponentially smoothed
+    transfer rate and an ETA derived from it.
+    """
+
+    def __init__(self, on_event=None, fps: float = DEFAULT_FPS, smoothing: float = 0.3, clock=time.monotonic):
+        self._on_event = on_event
+        self._interval = 1.0 / fps if fps > 0 else 0.0
+        self._smoothing = smoothing
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._phase = ""
+        self._percent = None
+        self._span = None
+        self._done = 0
+        self._total = 0
+        self._rate = 0.0
+        self._last_emit = None
+        self._sample_time = None
+        self._sample_done = 0
+
+    def phase(self, phase: str, percent: int = None, until: int = None):
+        """Enter a phase; transfer() then maps bytes into [percent, until] when given."""
+        with self._lock:
+            self._phase = phase
+            self._percent = percent
+            self._span = (percent, until) if percent is not None and until is not None else None
+            self._done = 0
+            self._total = 0
+            self._rate = 0.0
+            self._sample_time = self._clock()
+            self._sample_done = 0
+            event = self._event_locked()
+        self._emit(event)
+
+    def transfer(self, done: int, total: int = 0):
+        """Record bytes transferred in the current phase; emits only when a frame is due."""
+        now = self._clock()
+        with self._lock:
+            self._done = done
+            self._total = total
+            finished = total > 0 and done >= total
+            if not finished and self._last_emit is not None and now - self._last_emit < self._interval:
+                return
+            self._update_rate_locked(now)
+            if self._span and total > 0:
+                lo, hi = self._span
+                self._percent = lo + int(min(done, total) * (hi - lo) / total)
+            event = self._event_locked()
+        self._emit(event)
+
+    def _update_rate_locked(self, now: float):
+        if self._sample_time is None:
+            self._sample_time, self._sample_done = now, self._done
+            return
+        if self._done < self._sample_done:
+            # 重试后字节数从头计数，重新取样
+            self._sample_time, self._sample_done = now, self._done
+            return
+        elapsed = now - self._sample_time
+        if elapsed <= 0:
+            return
+        instant = (self._done - self._sample_done) / elapsed
+        if self._rate <= 0:
+            self._rate = instant
+        else:
+            self._rate += self._smoothing * (instant - self._rate)
+        self._sample_time, self._sample_done = now, self._done
+
+    def _event_locked(self) -> ProgressEvent:
+        eta = None
+        if self._total > 0 and self._rate > 0:
+            eta = max(0.0, (self._total - self._done) / self._rate)
+        self._last_emit = self._clock()
+        return ProgressEvent(
+            phase=self._phase,
+            percent=self._percent,
+            bytes_done=self._done,
+            bytes_total=self._total,
+            rate=self._rate,
+            eta=eta,
+        )
+
+    def _emit(self, event: ProgressEvent):
+        if self._on_event:
+            self._on_event(event)
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def format_transfer(event: ProgressEvent) -> str:
+    """Short language-neutral summary, e.g. '3.2 MB / 12.0 MB · 1.4 MB/s · 0:07'."""
+    if not event.bytes_done:
+        return ""
+    parts = [format_bytes(event.bytes_done)]
+    if event.bytes_total:
+        parts[0] += f" / {format_bytes(event.bytes_total)}"
+    if event.rate > 0:
+        parts.append(f"{format_bytes(event.rate)}/s")
+    if event.eta is not None:
+        m, s = divmod(int(event.eta + 0.5), 60)
+        parts.append(f"{m}:{s:02d}")
+    return " · ".join(parts)
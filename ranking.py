@@ -0,0 +1,105 @@
+"""Ranking index - which catalog entries fit the current display.
+
+Entries are bucketed by aspect ratio once per catalog. For a display each
+entry gets a tier (aspect close enough and at least the display resolution,
+aspect close enough but upscaled, anything else); selection keeps the best
+non-empty tier and indexes a precomputed candidate list, so a pick does not
+sort or filter the catalog again.
+"""
+
+import math
+import threading
+
+from config import RANK_ASPECT_STEPS, RANK_MAX_CROP
+
+TIER_FIT = 0  # 宽高比合适且分辨率不低于屏幕
+TIER_ASPECT = 1  # 宽高比合适，但需要放大（或尺寸未知）
+TIER_ANY = 2
+
+_index_lock = threading.Lock()
+_index = None
+
+
+def aspect_key(width: int, height: int) -> int | None:
+    """Aspect bucket: log2(width / height) quantized to 1 / RANK_ASPECT_STEPS."""
+    if not width or not height:
+        return None
+    return round(math.log2(width / height) * RANK_ASPECT_STEPS)
+
+
+def crop_loss(aspect: float, display: tuple[int, int]) -> float:
+    """Fraction of the image cut off when it is scaled to fill the display."""
+    target = display[0] / display[1]
+    return 1 - min(aspect, target) / max(aspect, target)
+
+
+class RankingIndex:
+    """Catalog entries grouped by aspect bucket, each bucket in pageid order."""
+
+    def __init__(self, images: list[dict]):
+        self.images = images
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._sorted = sorted(images, key=lambda x: x.get("pageid", 0) or 0)
+        self._buckets = {}
+        for im in self._sorted:
+            key = aspect_key(im.get("width", 0), im.get("height", 0))
+            self._buckets.setdefault(key, []).append(im)
+
+    def tiers(self, display: tuple[int, int], max_crop: float = RANK_MAX_CROP) -> dict:
+        """pageid -> tier for display; aspect is decided per bucket, resolution per entry."""
+        tiers = {}
+        for key, entries in self._buckets.items():
+            if key is None:
+                # 对端缓存等来源可能不带尺寸：无法判断，按“宽高比合适”处理
+                tiers.update((im.get("pageid"), TIER_ASPECT) for im in entries)
+                continue
+            if crop_loss(2 ** (key / RANK_ASPECT_STEPS), display) > max_crop:
+                tiers.update((im.get("pageid"), TIER_ANY) for im in entries)
+                continue
+            for im in entries:
+                covers = im.get("width", 0) >= display[0] and im.get("height", 0) >= display[1]
+                tiers[im.get("pageid")] = TIER_FIT if covers else TIER_ASPECT
+        return tiers
+
+    def candidates(self, display: tuple[int, int], theme: str = None) -> list[dict]:
+        """Deterministic candidate list for display and theme, built once per analysis state.
+
+        顺序与 select_image() 原来的一致：按 pageid 排序、折叠近似重复、按主题筛选，
+        最后只保留最合适的非空档位。
+        """
+        from core import _collapse_duplicates, _filter_by_theme
+
+        try:
+            from analysis import load_analysis
+            analysis = load_analysis()
+        except ImportError:
+            analysis = None
+        # 去重与主题筛选依赖分析缓存：其对象更换（新的分析结果落盘）后重新计算
+        key = (tuple(display), theme)
+        with self._lock:
+            hit = self._memo.get(key)
+        if hit is not None and hit[0] is analysis:
+            return hit[1]
+        ordered = _collapse_duplicates(self._sorted)
+        if theme:
+            ordered = _filter_by_theme(ordered, theme) or ordered
+        tiers = self.tiers(display)
+        result = ordered
+        for tier in (TIER_FIT, TIER_ASPECT):
+            chosen = [im for im in ordered if tiers.get(im.get("pageid"), TIER_ANY) <= tier]
+            if chosen:
+                result = chosen
+                break
+        with self._lock:
+            self._memo[key] = (analysis, result)
+        return result
+
+
+def get_index(images: list[dict]) -> RankingIndex:
+    """Index for this catalog list; rebuilt only when get_catalog() returns a new list."""
+    global _index
+    with _index_lock:
+        if _index is None or _index.images is not images:
+            _index = RankingIndex(images)
+        return _index
@@ -0,0 +1,95 @@
+"""Update scheduling - deterministic per-host stagger for network work.
+
+Every install switches day at local midnight, so network work (catalog sync,
+downloads) is spread over a window using an offset derived from a stable host
+identifier, while the switch itself stays at midnight and is purely local.
+"""
+
+import hashlib
+import socket
+import sys
+from datetime import date, datetime, time as dtime, timedelta
+from pathlib import Path
+
+from config import APP_NAME, CHECK_INTERVAL, PREFETCH_LEAD, STAGGER_WINDOW
+from core import load_config
+
+
+def _host_identifier() -> str:
+    cfg_id = load_config().get("host_id")
+    if cfg_id:
+        return str(cfg_id)
+    if sys.platform == "win32":
+        try:
+            import winreg
+            key = winreg.OpenKey(
+                winreg.HKEY_LOCAL_MACHINE,
+                r"SOFTWARE\Microsoft\Cryptography",
+                0, winreg.KEY_READ | getattr(winreg, "KEY_WOW64_64KEY", 0)
+            )
+            try:
+                value, _ = winreg.QueryValueEx(key, "MachineGuid")
+                if value:
+                    return str(value)
+            finally:
+                winreg.CloseKey(key)
+        except Exception:
+            pass
+    else:
+        for path in ("/etc/machine-id", "/var/lib/dbus/machine-id"):
+            try:
+                value = Path(path).read_text().strip()
+                if value:
+                    return value
+            except OSError:
+                pass
+    return socket.gethostname()
+
+
+def host_offset(window: float, host_id: str = None) -> float:
+    """Stable offset in [0, window) seconds for this machine."""
+    if window <= 0:
+        return 0.0
+    host_id = host_id or _host_identifier()
+    digest = hashlib.sha256(f"{APP_NAME}:{host_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 * window
+
+
+class StaggerSchedule:
+    """Per-host slots for one day.
+
+    - sync_at(d)：当天联网更新的时刻 = 午夜 + 偏移（没有预取时的兜底）；
+    - prefetch_at(d)：预取次日壁纸的时刻 = 次日午夜 - PREFETCH_LEAD + 偏移；
+    - 午夜本身只做本地切换（预取或已缓存的壁纸），不访问网络。
+    """
+
+    def __init__(self, window: float = STAGGER_WINDOW, prefetch_lead: float = PREFETCH_LEAD, host_id: str = None):
+        self.window = max(0.0, float(window))
+        self.prefetch_lead = max(self.window, float(prefetch_lead))
+        self.offset = host_offset(self.window, host_id)
+
+    @classmethod
+    def from_config(cls) -> "StaggerSchedule":
+        cfg = load_config()
+        return cls(
+            window=cfg.get("stagger_window", STAGGER_WINDOW),
+            prefetch_lead=cfg.get("prefetch_lead", PREFETCH_LEAD),
+        )
+
+    @staticmethod
+    def midnight(d: date) -> datetime:
+        return datetime.combine(d, dtime.min)
+
+    def sync_at(self, d: date) -> datetime:
+        return self.midnight(d) + timedelta(seconds=self.offset)
+
+    def prefetch_at(self, d: date) -> datetime:
+        return self.midnight(d + timedelta(days=1)) - timedelta(seconds=self.prefetch_lead - self.offset)
+
+    def next_wakeup(self, now: datetime, interval: float = CHECK_INTERVAL) -> datetime:
+        """Earliest of the next poll, midnight, and today's remaining slots."""
+        candidates = [now + timedelta(seconds=interval), self.midnight(now.date() + timedelta(days=1))]
+        for slot in (self.sync_at(now.date()), self.prefetch_at(now.date())):
+            if slot > now:
+                candidates.append(slot)
+        return min(candidates)
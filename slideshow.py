@@ -0,0 +1,251 @@
+"""Slideshow - rotate wallpapers every N minutes from a pool of pre-fitted images.
+
+A low-priority background thread keeps SLIDESHOW_POOL_SIZE images downloaded,
+cropped and scaled to the screen in SLIDESHOW_DIR (listed in SLIDESHOW_FILE).
+A rotation only applies the next ready file: no API call, download or decoding
+on the critical path. Enabled with "slideshow_minutes" in config.json.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+from pathlib import Path
+
+from config import (
+    LOCK_FILE,
+    LOCK_TIMEOUT,
+    SLIDESHOW_DIR,
+    SLIDESHOW_FILE,
+    SLIDESHOW_POOL_SIZE,
+    SLIDESHOW_RECENT,
+)
+from coordinator import InterProcessLock
+from core import (
+    CancelToken,
+    UpdateCancelled,
+    _cache_entry,
+    _check_cancel,
+    _is_cache_from_today,
+    _remove_quietly,
+    _save_current,
+    _theme_preference,
+    _write_json_atomic,
+    download_image,
+    ensure_dir,
+    get_catalog,
+    get_date_id,
+    get_file_extension,
+    load_config,
+    set_wallpaper,
+)
+from display import get_display_size
+from ranking import get_index
+
+_RETRY_DELAY = 600  # 补充失败（如离线）后的重试间隔（秒）
+
+
+def _load_state() -> dict:
+    try:
+        with open(SLIDESHOW_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return {"pool": list(data.get("pool") or []), "recent": list(data.get("recent") or [])}
+    except (OSError, ValueError):
+        pass
+    return {"pool": [], "recent": []}
+
+
+def _current_path() -> Path:
+    return Path(_is_cache_from_today()[1].get("path") or "")
+
+
+def _prune_orphans(keep: set):
+    # 跨天切换到每日壁纸后，上一张轮播图不会再被轮换逻辑删除
+    for path in SLIDESHOW_DIR.glob("*.jpg"):
+        if path not in keep:
+            _remove_quietly(path)
+
+
+def _lower_thread_priority():
+    """Best effort: run the calling thread below normal priority."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), -2)  # THREAD_PRIORITY_LOWEST
+        elif sys.platform.startswith("linux"):
+            # Linux 上 nice 值按线程生效
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (OSError, AttributeError):
+        pass
+
+
+def fit_image(src: Path, size: tuple[int, int]):
+    """src cropped and scaled to exactly size (centered), as an RGB PIL image."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        # JPEG 可在解码阶段直接按比例缩小，避免整张原图解码
+        img.draft("RGB", size)
+        return ImageOps.fit(img.convert("RGB"), size, Image.Resampling.LANCZOS)
+
+
+def fit_to_screen(src: Path, dest: Path, size: tuple[int, int]):
+    """Crop and scale src to exactly size (centered), saved as JPEG at dest."""
+    part = dest.with_suffix(dest.suffix + ".part")
+    fit_image(src, size).save(part, format="JPEG", quality=92)
+    os.replace(part, dest)
+
+
+class Slideshow:
+    """Pool-backed wallpaper rotation owned by the tray process.
+
+    轮换线程只从池中取下一张并应用；补充线程在低优先级下载、裁剪新图片，
+    每次轮换后被唤醒。池清单持久化在 SLIDESHOW_FILE 中，重启后继续使用。
+    topup(pool_size, cancel_token) 可替换补充方式（托盘在 worker 模式下交给 worker 进程）。
+    """
+
+    def __init__(self, interval: float, pool_size: int = SLIDESHOW_POOL_SIZE, on_change=None, topup=None):
+        self.interval = interval
+        self.pool_size = max(1, pool_size)
+        self._on_change = on_change
+        self._topup = topup or topup_pool
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._cancel_token = CancelToken()
+        self._threads = []
+
+    @classmethod
+    def from_config(cls, on_change=None, topup=None) -> "Slideshow | None":
+        cfg = load_config()
+        try:
+            minutes = float(cfg.get("slideshow_minutes") or 0)
+            pool_size = int(cfg.get("slideshow_pool") or SLIDESHOW_POOL_SIZE)
+        except (TypeError, ValueError):
+            return None
+        if minutes <= 0:
+            return None
+        return cls(max(1.0, minutes) * 60, pool_size, on_change, topup)
+
+    def start(self):
+        ensure_dir()
+        SLIDESHOW_DIR.mkdir(parents=True, exist_ok=True)
+        for target, name in ((self._rotate_loop, "SlideshowThread"), (self._topup_loop, "SlideshowTopUpThread")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._cancel_token.cancel()
+
+    def next(self) -> bool:
+        """Apply the next pooled image; False when the pool is empty or an update holds the lock."""
+        lock = InterProcessLock(LOCK_FILE)
+        if not lock.try_acquire():
+            return False
+        try:
+            # 池清单的读写都在更新锁内，补充方（本进程线程或 worker 进程）同样持锁追加
+            state = _load_state()
+            pool = [e for e in state["pool"] if Path(e.get("path", "")).is_file()]
+            if not pool:
+                return False
+            entry = pool.pop(0)
+            path = Path(entry["path"])
+            previous = _current_path()
+            if not set_wallpaper(path):
+                return False
+            cache = _cache_entry(entry, path, get_date_id())
+            cache["fitted"] = True  # 裁剪后的副本，peer.py 不应把它当作原图提供
+            _save_current(cache)
+            if previous != path and previous.parent == SLIDESHOW_DIR:
+                _remove_quietly(previous)
+            recent = [p for p in state["recent"] if p != entry.get("pageid")] + [entry.get("pageid")]
+            _write_json_atomic(SLIDESHOW_FILE, {"pool": pool, "recent": recent[-SLIDESHOW_RECENT:]})
+        finally:
+            lock.release()
+        self._wake.set()
+        if self._on_change:
+            try:
+                self._on_change()
+            except Exception:
+                pass
+        return True
+
+    def _rotate_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.next()
+            except Exception:
+                pass
+
+    def _topup_loop(self):
+        _lower_thread_priority()
+        while not self._stop.is_set():
+            try:
+                complete = self._topup(self.pool_size, self._cancel_token)
+            except UpdateCancelled:
+                return
+            except Exception:
+                complete = False
+            self._wake.wait(None if complete else _RETRY_DELAY)
+            self._wake.clear()
+
+
+def _candidates(pooled: set, recent: set, cancel_token: CancelToken | None = None) -> list[dict]:
+    # 与每日选图相同的候选：去重、主题筛选、只保留适合当前屏幕的一档
+    images = get_index(get_catalog(cancel_token=cancel_token)).candidates(get_display_size(), _theme_preference())
+    images = [im for im in images if im.get("pageid") and im["pageid"] not in pooled]
+    # 图片列表比“最近展示”还短时，允许重复
+    return [im for im in images if im["pageid"] not in recent] or images
+
+
+def topup_pool(pool_size: int, cancel_token: CancelToken | None = None) -> bool:
+    """Fill the pool up to pool_size; True once it is full.
+
+    在托盘进程的补充线程中运行，worker 模式下则在 worker 进程中（托盘不下载、不加载 Pillow）；
+    追加池条目时持有更新锁，与轮换线程的写入互斥。
+    """
+    ensure_dir()
+    SLIDESHOW_DIR.mkdir(parents=True, exist_ok=True)
+    state = _load_state()
+    pool = [e for e in state["pool"] if Path(e.get("path", "")).is_file()]
+    missing = pool_size - len(pool)
+    if missing <= 0:
+        return True
+    current = _current_path()
+    _prune_orphans({Path(e["path"]) for e in pool} | {current})
+    candidates = _candidates({e.get("pageid") for e in pool}, set(state["recent"]), cancel_token)
+    if not candidates:
+        return False
+    size = get_display_size()
+    for selected in random.sample(candidates, min(missing, len(candidates))):
+        _check_cancel(cancel_token)
+        pageid = selected.get("pageid")
+        src = SLIDESHOW_DIR / f"src_{pageid}{get_file_extension(selected['url'])}"
+        dest = SLIDESHOW_DIR / f"{pageid}.jpg"
+        if current == dest:
+            continue
+        if not download_image(selected["url"], src, cancel_token=cancel_token):
+            return False
+        try:
+            fit_to_screen(src, dest, size)
+        except Exception:
+            _remove_quietly(dest)
+            continue
+        finally:
+            _remove_quietly(src)
+        entry = dict(_cache_entry(selected, dest, get_date_id()), pageid=pageid)
+        lock = InterProcessLock(LOCK_FILE)
+        if not lock.acquire(timeout=LOCK_TIMEOUT, cancel_token=cancel_token):
+            return False
+        try:
+            state = _load_state()
+            state["pool"].append(entry)
+            _write_json_atomic(SLIDESHOW_FILE, state)
+        finally:
+            lock.release()
+    return len(_load_state()["pool"]) >= pool_size
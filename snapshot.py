@@ -0,0 +1,204 @@
+"""Snapshots - bundle catalog, analysis cache and upcoming wallpapers for offline seeding.
+
+`wallpaper.py --export-snapshot FILE [--days N]` writes a zip with a manifest
+(SHA-256 per file), the catalog, the thumbnail analysis cache and the
+wallpapers of the next N days, already fitted to the display. On a fresh
+install `--import-snapshot FILE` verifies and unpacks it into WALLPAPER_DIR
+without any network access; the first update then applies the prefetched
+image and the catalog serves as fallback while the API is unreachable.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from config import (
+    ANALYSIS_FILE,
+    CATALOG_FILE,
+    LOCK_FILE,
+    LOCK_TIMEOUT,
+    PREFETCH_FILE,
+    SNAPSHOT_DAYS,
+    WALLPAPER_DIR,
+)
+from core import (
+    CancelToken,
+    _cache_entry,
+    _check_cancel,
+    _date_id_for,
+    _load_prefetch,
+    _remove_quietly,
+    _theme_preference,
+    _write_json_atomic,
+    download_image,
+    ensure_dir,
+    get_catalog,
+    get_date_id,
+    get_file_extension,
+    select_image,
+)
+from version import __version__
+
+SNAPSHOT_FORMAT = 1
+_MANIFEST = "manifest.json"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_snapshot(dest: str | Path, days: int = SNAPSHOT_DAYS, cancel_token: CancelToken | None = None) -> dict:
+    """Build the snapshot zip at dest; returns its manifest. Raises RuntimeError without a catalog."""
+    from display import get_display_size
+    from slideshow import fit_to_screen
+
+    ensure_dir()
+    images = get_catalog(cancel_token=cancel_token)
+    if not images:
+        raise RuntimeError("catalog unavailable")
+    size = get_display_size()
+    theme = _theme_preference()
+    dest = Path(dest)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "app_version": __version__,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "display": list(size),
+        "files": {},
+        "prefetch": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="dcw_snapshot_") as tmp:
+        tmp = Path(tmp)
+        staged = {"catalog.json": tmp / "catalog.json"}
+        with open(staged["catalog.json"], "w", encoding="utf-8") as f:
+            json.dump(images, f, ensure_ascii=False)
+        if ANALYSIS_FILE.exists():
+            staged["analysis.json"] = ANALYSIS_FILE
+
+        for day in range(max(1, days)):
+            _check_cancel(cancel_token)
+            date_id = _date_id_for(day)
+            selected = select_image(images, date_id, theme=theme, display=size)
+            if not selected:
+                continue
+            src = tmp / f"src_{date_id}{get_file_extension(selected['url'])}"
+            if not download_image(selected["url"], src, cancel_token=cancel_token):
+                raise RuntimeError(f"download failed: {selected['url']}")
+            name = f"images/wallpaper_{date_id}.jpg"
+            staged[name] = tmp / f"wallpaper_{date_id}.jpg"
+            # 按目标屏幕裁好：导入后首次启动直接应用，不再解码原图
+            fit_to_screen(src, staged[name], size)
+            _remove_quietly(src)
+            entry = _cache_entry(selected, Path(name), date_id)
+            entry["path"] = name  # zip 内的相对路径，导入时换成本机路径
+            entry["fitted"] = True  # 裁剪后的副本，peer.py 不应把它当作原图提供
+            manifest["prefetch"][str(date_id)] = entry
+
+        for name, path in staged.items():
+            manifest["files"][name] = {"sha256": _sha256(path), "size": path.stat().st_size}
+        part = dest.with_name(dest.name + ".part")
+        # JPEG 已经是压缩格式，直接存储；导入时无需解压计算
+        with zipfile.ZipFile(part, "w", compression=zipfile.ZIP_STORED) as zf:
+            zf.writestr(_MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+            for name, path in staged.items():
+                zf.write(path, name)
+        os.replace(part, dest)
+    return manifest
+
+
+def _extract_verified(zf: zipfile.ZipFile, name: str, info: dict, target: Path):
+    part = target.with_name(target.name + ".part")
+    digest = hashlib.sha256()
+    with zf.open(name) as src, open(part, "wb") as out:
+        for block in iter(lambda: src.read(1024 * 1024), b""):
+            digest.update(block)
+            out.write(block)
+    if digest.hexdigest() != info.get("sha256"):
+        _remove_quietly(part)
+        raise ValueError(f"checksum mismatch: {name}")
+    return part
+
+
+def _read_json(path: Path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def import_snapshot(src: str | Path) -> dict:
+    """Verify and unpack a snapshot into WALLPAPER_DIR; returns counts.
+
+    所有文件先解出为 .part 并校验 SHA-256，全部通过后才替换到位，
+    校验失败（ValueError）时不改动现有数据。
+    """
+    from coordinator import InterProcessLock
+
+    ensure_dir()
+    today = get_date_id()
+    staged = {}
+    try:
+        with zipfile.ZipFile(src) as zf:
+            manifest = json.loads(zf.read(_MANIFEST))
+            if manifest.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"unsupported snapshot format: {manifest.get('format')}")
+            files = manifest.get("files") or {}
+            # 已过期的日期与本机已预取的日期都不导入，不覆盖本机文件
+            local = _load_prefetch()
+            upcoming = {k: v for k, v in (manifest.get("prefetch") or {}).items()
+                        if k.isdigit() and int(k) >= today and k not in local}
+            wanted = ["catalog.json", "analysis.json"] + [e["path"] for e in upcoming.values()]
+            for name in wanted:
+                if name not in files:
+                    continue
+                if name not in zf.namelist():
+                    raise ValueError(f"missing file: {name}")
+                target = WALLPAPER_DIR / Path(name).name
+                staged[target] = _extract_verified(zf, name, files[name], target)
+    except Exception:
+        for part in staged.values():
+            _remove_quietly(part)
+        raise
+
+    lock = InterProcessLock(LOCK_FILE)
+    if not lock.acquire(timeout=LOCK_TIMEOUT):
+        for part in staged.values():
+            _remove_quietly(part)
+        raise TimeoutError("another update holds the lock")
+    try:
+        analysis_part = staged.pop(ANALYSIS_FILE, None)
+        if analysis_part:
+            # 合并而非覆盖：本机已有的分析结果优先
+            imported = _read_json(analysis_part, {})
+            existing = _read_json(ANALYSIS_FILE, {})
+            _write_json_atomic(ANALYSIS_FILE, {**imported, **existing})
+            _remove_quietly(analysis_part)
+        for target, part in staged.items():
+            os.replace(part, target)
+
+        entries = {k: v for k, v in _load_prefetch().items() if k.isdigit() and int(k) >= today}
+        imported_days = 0
+        for date_id, entry in upcoming.items():
+            path = WALLPAPER_DIR / Path(entry["path"]).name
+            if date_id in entries or not path.exists():
+                continue
+            entries[date_id] = dict(entry, path=str(path))
+            imported_days += 1
+        _write_json_atomic(PREFETCH_FILE, entries)
+    finally:
+        lock.release()
+    return {
+        "days": imported_days,
+        "catalog": CATALOG_FILE in staged,
+        "analysis": analysis_part is not None,
+        "created": manifest.get("created"),
+    }
@@ -0,0 +1,175 @@
+"""Image sources - where the catalog comes from (Commons or a local folder).
+
+"source": "local" plus "source_path" in config.json switches to a directory
+(e.g. a curated mirror share for air-gapped sites). Its index in
+LOCAL_INDEX_FILE keeps path, size, mtime, dimensions and content hash per file;
+rescans only re-read files whose size or mtime changed.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from config import LOCAL_INDEX_FILE, LOCAL_SOURCE_EXTENSIONS, MIN_HEIGHT, MIN_WIDTH
+from core import (
+    CancelToken,
+    UpdateCancelled,
+    _check_cancel,
+    _write_json_atomic,
+    ensure_dir,
+    fetch_images_from_commons,
+    load_config,
+)
+
+_INDEX_SAVE_EVERY = 500  # 首次索引大目录时每新增这么多条落盘一次，中断后可续扫
+
+
+class ImageSource:
+    """Catalog provider; entries use the fetch_images_from_commons() shape."""
+
+    name = ""
+
+    def cache_key(self) -> str:
+        return self.name
+
+    def list_images(self, limit: int = 500, cancel_token: CancelToken | None = None,
+                    use_peer: bool = True) -> list[dict]:
+        raise NotImplementedError
+
+
+class CommonsSource(ImageSource):
+    name = "commons"
+
+    def list_images(self, limit: int = 500, cancel_token: CancelToken | None = None,
+                    use_peer: bool = True) -> list[dict]:
+        return fetch_images_from_commons(limit=limit, cancel_token=cancel_token, use_peer=use_peer)
+
+
+def _hash_file(path: str, cancel_token: CancelToken | None = None) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            _check_cancel(cancel_token)
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _image_size(path: str) -> tuple[int, int]:
+    from PIL import Image
+
+    # Image.open 只解析文件头，不解码像素
+    with Image.open(path) as img:
+        return img.size
+
+
+def _walk(root: str):
+    """Yield (relpath, stat) for image files under root; os.scandir reuses directory entry stats."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in LOCAL_SOURCE_EXTENSIONS:
+                            yield os.path.relpath(entry.path, root), entry.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class LocalFolderSource(ImageSource):
+    """Images in a local or mounted directory, indexed incrementally."""
+
+    name = "local"
+
+    def __init__(self, root: str | Path, index_path: Path = LOCAL_INDEX_FILE):
+        self.root = str(Path(root).expanduser().absolute())
+        self.index_path = index_path
+
+    def cache_key(self) -> str:
+        return f"local:{self.root}"
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("root") == self.root:
+                return data.get("files") or {}
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _save_index(self, files: dict):
+        ensure_dir()
+        _write_json_atomic(self.index_path, {"root": self.root, "files": files})
+
+    def rescan(self, cancel_token: CancelToken | None = None) -> dict:
+        """Update the index; unchanged files (same size and mtime) are not opened."""
+        old = self._load_index()
+        files = {}
+        pending = 0
+        changed = False
+        for rel, st in _walk(self.root):
+            _check_cancel(cancel_token)
+            prev = old.get(rel)
+            if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+                files[rel] = prev
+                continue
+            path = os.path.join(self.root, rel)
+            try:
+                width, height = _image_size(path)
+                sha1 = _hash_file(path, cancel_token)
+            except UpdateCancelled:
+                raise
+            except Exception:
+                # 读取失败或 PIL 无法识别（损坏、格式不支持）的文件直接跳过
+                continue
+            files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "width": width, "height": height,
+                          "sha1": sha1}
+            changed = True
+            pending += 1
+            if pending >= _INDEX_SAVE_EVERY:
+                self._save_index({**old, **files})
+                pending = 0
+        if changed or len(files) != len(old):
+            self._save_index(files)
+        return files
+
+    def list_images(self, limit: int = 500, cancel_token: CancelToken | None = None,
+                    use_peer: bool = True) -> list[dict]:
+        # limit 只对 Commons API 有意义；本地目录返回全部合格图片
+        if not os.path.isdir(self.root):
+            return []
+        images = []
+        for rel, info in self.rescan(cancel_token).items():
+            if info.get("width", 0) < MIN_WIDTH or info.get("height", 0) < MIN_HEIGHT:
+                continue
+            path = Path(self.root) / rel
+            images.append({
+                # 由内容哈希得到的稳定负数 id：重命名不影响每日选择，也不会与 Commons pageid 冲突
+                "pageid": -int(info["sha1"][:13], 16),
+                "title": path.name,
+                "url": path.as_uri(),
+                "descriptionurl": "",
+                "width": info["width"],
+                "height": info["height"],
+                "source": self.name,
+                "metadata": {"title": path.stem, "description": "", "artist": "", "license": "", "credit": ""},
+            })
+        return images
+
+
+def get_source() -> ImageSource:
+    """Source selected in config.json; Commons unless a usable local folder is configured."""
+    cfg = load_config()
+    if cfg.get("source") == LocalFolderSource.name and cfg.get("source_path"):
+        return LocalFolderSource(cfg["source_path"])
+    return CommonsSource()
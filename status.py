@@ -0,0 +1,133 @@
+"""Status - what is applied and how the cache is doing, from local files only.
+
+Backs `wallpaper.py --status [--json]` for scripts and helpdesk tooling. Only
+the standard library and config are imported (no core, urllib, sockets, PIL
+or GUI toolkits), so a query costs little more than interpreter start-up.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+from config import (
+    CACHE_FILE,
+    PREFETCH_FILE,
+    STATE_FILE,
+    STATUS_UNHEALTHY_FAILURES,
+    WALLPAPER_DIR,
+)
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, type(default)) else default
+    except (OSError, ValueError):
+        return default
+
+
+def _dir_usage(root: str) -> tuple[int, int]:
+    files = size = 0
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files += 1
+                            size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files, size
+
+
+def _count_since(failures: list, since: datetime) -> int:
+    count = 0
+    for failure in failures:
+        try:
+            if datetime.fromisoformat(failure["time"]) >= since:
+                count += 1
+        except (KeyError, TypeError, ValueError):
+            continue
+    return count
+
+
+def collect_status() -> dict:
+    now = datetime.now()
+    cache = _read_json(CACHE_FILE, {})
+    state = _read_json(STATE_FILE, {})
+    today = int(now.strftime("%Y%m%d"))
+    prefetched = sorted(int(k) for k, v in _read_json(PREFETCH_FILE, {}).items()
+                        if k.isdigit() and int(k) >= today and isinstance(v, dict)
+                        and os.path.isfile(v.get("path", "")))
+    applied = None
+    if cache:
+        meta = cache.get("metadata") or {}
+        applied = {
+            "title": meta.get("title") or cache.get("title", ""),
+            "artist": meta.get("artist", ""),
+            "path": cache.get("path", ""),
+            "exists": os.path.isfile(cache.get("path", "")),
+            "applied_at": cache.get("date", ""),
+            "today": cache.get("date", "")[:10] == now.strftime("%Y-%m-%d"),
+            "url": cache.get("descriptionurl") or cache.get("url", ""),
+            "preview": bool(cache.get("preview")),
+            "fitted": bool(cache.get("fitted")),
+            "span": bool(cache.get("span")),
+            "monitors": len(cache.get("monitors") or []) or 1,
+        }
+    files, size = _dir_usage(str(WALLPAPER_DIR))
+    failures = list(state.get("failures") or [])
+    consecutive = int(state.get("consecutive_failures") or 0)
+    return {
+        "applied": applied,
+        "last_sync": state.get("last_sync"),
+        "last_sync_source": state.get("last_sync_source"),
+        "catalog_size": state.get("catalog_size"),
+        "last_update": state.get("last_update"),
+        "last_success": state.get("last_success"),
+        "prefetched": prefetched,
+        "cache": {"path": str(WALLPAPER_DIR), "files": files, "bytes": size},
+        "failures": {
+            "last_24h": _count_since(failures, now - timedelta(days=1)),
+            "last_7d": _count_since(failures, now - timedelta(days=7)),
+            "consecutive": consecutive,
+            "last": failures[-1]["time"] if failures and isinstance(failures[-1], dict) else None,
+        },
+        "healthy": bool(applied and applied["exists"]) and consecutive < STATUS_UNHEALTHY_FAILURES,
+    }
+
+
+def format_status(status: dict) -> str:
+    applied = status["applied"]
+    failures = status["failures"]
+    cache = status["cache"]
+    lines = [f"status:        {'healthy' if status['healthy'] else 'unhealthy'}"]
+    if applied:
+        flags = [f for f in ("preview", "fitted") if applied[f]] + ([] if applied["exists"] else ["missing"])
+        if applied["span"]:
+            flags.append(f"span, {applied['monitors']} monitors")
+        lines += [
+            f"wallpaper:     {applied['title'] or '-'}" + (f" ({', '.join(flags)})" if flags else ""),
+            f"applied at:    {applied['applied_at'] or '-'}",
+            f"file:          {applied['path'] or '-'}",
+            f"page:          {applied['url'] or '-'}",
+        ]
+    else:
+        lines.append("wallpaper:     none")
+    lines += [
+        f"last sync:     {status['last_sync'] or 'never'}"
+        + (f" ({status['last_sync_source']}, {status['catalog_size']} images)" if status["last_sync"] else ""),
+        f"last update:   {status['last_update'] or 'never'} (last success: {status['last_success'] or 'never'})",
+        f"prefetched:    {', '.join(str(d) for d in status['prefetched']) or 'none'}",
+        f"cache:         {cache['files']} files, {cache['bytes'] / 1024 / 1024:.1f} MiB in {cache['path']}",
+        f"failures:      {failures['last_24h']} in 24h, {failures['last_7d']} in 7d, "
+        f"{failures['consecutive']} consecutive" + (f" (last {failures['last']})" if failures["last"] else ""),
+    ]
+    return "\n".join(lines)
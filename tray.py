@@ -8,17 +8,26 @@ import threading
 import time
 from pathlib import Path
 
-from config import APP_NAME, CHECK_INTERVAL, ICON_FILE, WALLPAPER_DIR
+from config import APP_NAME, CHECK_INTERVAL, HISTORY_FILE, ICON_FILE, INSTANCE_LOCK_FILE, WALLPAPER_DIR
 from version import __version__
+from progress import DEFAULT_FPS, ProgressEvent, format_transfer
 from core import (
+    CancelToken,
     ensure_dir,
+    get_catalog,
     get_current_wallpaper_info,
     load_config,
     open_folder,
     open_url,
     save_config,
-    update_wallpaper,
 )
+from coordinator import InterProcessLock, coordinated_prefetch, coordinated_update
+from executor import PRIORITY_BACKGROUND, PRIORITY_CONTROL, TaskExecutor
+from ipc import IpcServer
+from metrics import SCHEDULER_RUNS, serve_metrics
+from scheduler import StaggerSchedule
+from slideshow import Slideshow, topup_pool
+from worker import prefetch_result_without_worker, run_task, update_result_without_worker
 
 
 def _load_i18n():
@@ -260,9 +269,14 @@ def _show_wallpaper_info_dialog():
 
 
 def _run_progress_dialog(on_complete):
-    """Run progress dialog in current thread (no new threads)."""
+    """Run progress dialog in current thread; the update itself runs in a worker thread.
+
+    Tk 只能在创建它的线程中操作，因此工作线程只把进度放进队列，由对话框线程
+    通过 after() 取出刷新界面。进度事件已按帧率合并，每帧只绘制最新一条。
+    取消按钮或关闭窗口会触发 CancelToken。
+    """
     t = _load_i18n()
-    status_keys = ["fetching", "selecting", "downloading", "setting", "done", "error"]
+    status_keys = ["waiting", "fetching", "selecting", "downloading", "setting", "done", "error", "cancelled"]
     status_text = {k: t(f"progress_{k}") for k in status_keys}
 
     import tkinter as tk
@@ -271,42 +285,285 @@ def _run_progress_dialog(on_complete):
     root = tk.Tk()
     root.title(t("dialog_title"))
     root.resizable(False, False)
-    root.geometry("320x140")
+    root.geometry("320x160")
     root.attributes("-topmost", True)
 
     label = tk.Label(root, text=status_text["fetching"])
-    label.pack(pady=(20, 8), padx=20, anchor="w")
+    label.pack(pady=(20, 4), padx=20, anchor="w")
+
+    detail = tk.Label(root, text="", fg="gray40")
+    detail.pack(padx=20, anchor="w")
 
     progress = ttk.Progressbar(root, length=280, mode="determinate")
     progress.pack(pady=8, padx=20, fill="x")
     progress["value"] = 0
 
+    cancel_token = CancelToken()
+    events = queue.Queue()
+    frame_ms = int(1000 / DEFAULT_FPS)
+    state = {"ok": None, "completed": False}
+
+    def request_cancel():
+        cancel_btn.config(state="disabled")
+        cancel_token.cancel()
+
     btn_frame = tk.Frame(root)
     btn_frame.pack(pady=(16, 12))
     ok_btn = tk.Button(btn_frame, text=t("btn_ok"), width=8, command=lambda: root.destroy(), state="disabled")
-    ok_btn.pack()
+    ok_btn.pack(side="left", padx=4)
+    cancel_btn = tk.Button(btn_frame, text=t("btn_cancel"), width=8, command=request_cancel)
+    cancel_btn.pack(side="left", padx=4)
 
-    def progress_cb(step: str, pct: int):
-        label.config(text=status_text.get(step, step))
-        if pct is not None:
-            progress["value"] = pct
-        root.update()
+    def work():
+        try:
+            ok = coordinated_update(force_refresh=True, cancel_token=cancel_token, on_event=events.put)
+        except Exception:
+            ok = False
+            events.put(ProgressEvent("error", 0))
+        state["ok"] = ok
+        events.put(None)
+
+    def finish(ok: bool):
+        state["completed"] = True
+        progress["value"] = 100 if ok else 0
+        if ok:
+            label.config(text=status_text["done"])
+        elif cancel_token.cancelled:
+            label.config(text=status_text["cancelled"])
+        else:
+            label.config(text=status_text["error"])
+        detail.config(text="")
+        cancel_btn.config(state="disabled")
+        ok_btn.config(state="normal")
+        on_complete(ok)
+
+    def poll():
+        latest = None
+        finished = False
+        try:
+            while True:
+                event = events.get_nowait()
+                if event is None:
+                    finished = True
+                    break
+                latest = event
+        except queue.Empty:
+            pass
+        if latest is not None:
+            label.config(text=status_text.get(latest.phase, latest.phase))
+            if latest.percent is not None:
+                progress["value"] = latest.percent
+            detail.config(text=format_transfer(latest))
+        if finished:
+            finish(bool(state["ok"]))
+            return
+        root.after(frame_ms, poll)
+
+    def on_close():
+        # 更新尚未结束时关闭窗口等同于取消
+        if not state["completed"]:
+            cancel_token.cancel()
+        root.destroy()
+
+    worker = threading.Thread(target=work, name="WallpaperUpdateThread", daemon=True)
+    worker.start()
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(frame_ms, poll)
+    root.mainloop()
+    if not state["completed"]:
+        worker.join()
+        on_complete(bool(state["ok"]))
 
-    root.update()
-    try:
-        ok = update_wallpaper(force_refresh=True, progress_callback=progress_cb)
-    except Exception:
-        ok = False
-        progress_cb("error", 0)
-
-    progress["value"] = 100 if ok else 0
-    label.config(text=status_text["done"] if ok else status_text["error"])
-    ok_btn.config(state="normal")
-    on_complete(ok)
-    root.protocol("WM_DELETE_WINDOW", root.destroy)
+
+def _show_history_dialog():
+    """Grid of past wallpapers with full details; re-apply or open the Commons page.
+
+    缩略图全部裁自缓存的精灵图，打开窗口时只为新增的历史条目解码图片。
+    重新应用可能需要下载原图，在工作线程中进行，结果经队列由 after() 取回。
+    """
+    from config import SPRITE_CELL
+    from core import commons_page_url, load_history
+    from history import cell_box, load_sprites, reapply, sprite_key
+
+    t = _load_i18n()
+    history = list(reversed(load_history()))
+    index, sheet = load_sprites(history) if history else ({}, None)
+
+    import tkinter as tk
+    from tkinter import ttk
+    from PIL import Image, ImageTk
+
+    root = tk.Tk()
+    root.title(t("menu_history"))
+    root.geometry("740x600")
+
+    btn_frame = tk.Frame(root)
+    btn_frame.pack(side="bottom", pady=(4, 12))
+    status = tk.Label(root, text="", fg="gray40")
+    status.pack(side="bottom", padx=12, anchor="w")
+
+    if not history:
+        tk.Label(root, text=t("history_empty")).pack(expand=True)
+        tk.Button(btn_frame, text=t("btn_close"), width=10, command=root.destroy).pack()
+        root.mainloop()
+        return
+
+    details = tk.Text(root, height=7, wrap="word", relief="flat", bg=root.cget("bg"))
+    details.pack(side="bottom", fill="x", padx=12, pady=(8, 0))
+
+    container = tk.Frame(root)
+    container.pack(side="top", fill="both", expand=True, padx=8, pady=(8, 0))
+    canvas = tk.Canvas(container, highlightthickness=0)
+    scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
+    grid = tk.Frame(canvas)
+    canvas.create_window((0, 0), window=grid, anchor="nw")
+    grid.bind("<Configure>", lambda _: canvas.configure(scrollregion=canvas.bbox("all")))
+    canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.bind_all("<MouseWheel>", lambda e: canvas.yview_scroll(int(-e.delta / 120), "units"))
+    scrollbar.pack(side="right", fill="y")
+    canvas.pack(side="left", fill="both", expand=True)
+
+    selected = [history[0]]
+    results = queue.Queue()
+
+    def show(entry: dict):
+        selected[0] = entry
+        meta = entry.get("metadata") or {}
+        unknown = t("info_unknown")
+        lines = [
+            f"{t('info_title')}: {meta.get('title') or entry.get('title') or unknown}",
+            f"{t('info_artist')}: {(meta.get('artist') or '').strip() or unknown}",
+            f"{t('info_license')}: {meta.get('license') or unknown}",
+            f"{t('info_description')}: {meta.get('description') or ''}",
+        ]
+        details.config(state="normal")
+        details.delete("1.0", "end")
+        details.insert("1.0", "\n".join(lines))
+        details.config(state="disabled")
+        status.config(text="")
+
+    # PhotoImage 需要保持引用，否则会被回收而显示空白
+    photos = [ImageTk.PhotoImage(Image.new("RGB", SPRITE_CELL, (32, 32, 32)), master=root)]
+    slots = index.get("slots", {})
+    for i, entry in enumerate(history):
+        slot = slots.get(sprite_key(entry))
+        photo = photos[0]
+        if sheet is not None and slot is not None:
+            photo = ImageTk.PhotoImage(sheet.crop(cell_box(index, slot)), master=root)
+            photos.append(photo)
+        tk.Button(grid, image=photo, text=(entry.get("date") or "")[:10], compound="top", relief="flat",
+                  command=lambda e=entry: show(e)).grid(row=i // 4, column=i % 4, padx=4, pady=4)
+
+    def apply():
+        apply_btn.config(state="disabled")
+        status.config(text=t("history_applying"))
+        entry = selected[0]
+
+        def work():
+            try:
+                results.put(reapply(entry))
+            except Exception:
+                results.put(False)
+
+        threading.Thread(target=work, name="HistoryApplyThread", daemon=True).start()
+        root.after(100, poll)
+
+    def poll():
+        try:
+            ok = results.get_nowait()
+        except queue.Empty:
+            root.after(100, poll)
+            return
+        apply_btn.config(state="normal")
+        status.config(text=t("progress_done") if ok else t("progress_error"))
+
+    apply_btn = tk.Button(btn_frame, text=t("history_apply"), width=16, command=apply)
+    apply_btn.pack(side="left", padx=4)
+    tk.Button(btn_frame, text=t("menu_view_commons"), width=16,
+              command=lambda: open_url(commons_page_url(selected[0]) or "https://commons.wikimedia.org/")
+              ).pack(side="left", padx=4)
+    tk.Button(btn_frame, text=t("btn_close"), width=10, command=root.destroy).pack(side="left", padx=4)
+
+    show(history[0])
     root.mainloop()
 
 
+def _run_history_dialog():
+    # worker 模式下历史窗口（tkinter、Pillow 解码）在 worker 进程中显示
+    if _use_worker_process():
+        run_task("history")
+        return
+    _show_history_dialog()
+
+
+def _use_worker_process() -> bool:
+    return bool(load_config().get("worker_process"))
+
+
+def _update(**kwargs) -> bool:
+    """coordinated_update() here, or in a short-lived worker process when enabled."""
+    if _use_worker_process():
+        # 先在托盘进程中只读检查本地 JSON，确实有事可做才冷启动 worker
+        local = None if kwargs.get("force_refresh") else update_result_without_worker(kwargs.get("local_only", False))
+        return local if local is not None else run_task("update", kwargs)
+    return coordinated_update(**kwargs)
+
+
+def _prefetch(days_ahead: int = 1) -> bool:
+    if _use_worker_process():
+        if prefetch_result_without_worker(days_ahead):
+            return True
+        return run_task("prefetch", {"days_ahead": days_ahead})
+    return coordinated_prefetch(days_ahead)
+
+
+def _analyze_catalog():
+    if _use_worker_process():
+        run_task("analyze")
+        return
+    from analysis import analyze_catalog
+    analyze_catalog(get_catalog())
+
+
+def _compact_archive():
+    # worker 模式下归档压缩（Pillow 编码进程池）也在 worker 中进行，托盘进程不加载 PIL
+    if _use_worker_process():
+        run_task("archive")
+        return
+    from archive import compact_archive
+    compact_archive()
+
+
+def _slideshow_topup(pool_size: int, cancel_token: CancelToken) -> bool:
+    # worker 模式下轮播池的下载与裁剪（Pillow）在 worker 进程中进行；托盘只负责按时轮换
+    if _use_worker_process():
+        return run_task("slideshow_topup", {"pool_size": pool_size}, cancel_token=cancel_token)
+    return topup_pool(pool_size, cancel_token)
+
+
+def _run_refresh_dialog(on_complete):
+    # worker 模式下对话框（tkinter）也在 worker 进程中显示，托盘进程不加载 tkinter
+    if _use_worker_process():
+        on_complete(run_task("dialog"))
+        return
+    _run_progress_dialog(on_complete)
+
+
+def _debug_menu_enabled() -> bool:
+    return bool(load_config().get("debug_menu"))
+
+
+def _profile_update_and_show():
+    """Debug menu: profile one forced update in this process, then open the report folder."""
+    from config import PROFILES_DIR
+    from profiler import profile_update
+
+    try:
+        profile_update()
+    finally:
+        open_folder(PROFILES_DIR)
+
+
 def run_tray_app():
     # 启动时先根据配置校准开机自启注册表
     try:
@@ -325,6 +582,11 @@ def run_tray_app():
     except Exception:
         pass
 
+    # 单实例：已有托盘持有实例锁时直接退出（命令已由 wallpaper.py 通过 IPC 转交）
+    instance_lock = InterProcessLock(INSTANCE_LOCK_FILE)
+    if not instance_lock.try_acquire():
+        return
+
     t = _load_i18n()
     ensure_dir()
     icon_path = str(create_tray_icon_file())
@@ -334,7 +596,9 @@ def run_tray_app():
     from datetime import datetime
     last_date = datetime.now().date()
     systray_ref = [None]
-    dialog_queue = queue.Queue()
+    quit_ref = [None]
+    # 菜单点击、对话框与 IPC 转交的任务统一交给一个有界线程池（两种托盘后端共用）
+    executor = TaskExecutor()
 
     def _set_hover(text: str):
         s = systray_ref[0]
@@ -344,14 +608,9 @@ def run_tray_app():
             except Exception:
                 pass
 
-    def _dialog_worker():
-        while True:
-            try:
-                on_complete = dialog_queue.get(timeout=1.0)
-            except queue.Empty:
-                continue
-            _set_hover(t("menu_downloading"))
-            _run_progress_dialog(on_complete)
+    def _refresh_with_dialog(on_complete):
+        _set_hover(t("menu_downloading"))
+        _run_refresh_dialog(on_complete)
 
     def on_change_wallpaper(systray):
         def on_complete(ok):
@@ -360,7 +619,8 @@ def run_tray_app():
             if ok:
                 last_date = datetime.now().date()
                 _update_hover_text(systray_ref)
-        dialog_queue.put(on_complete)
+        # 对话框打开期间重复点击不会再排队一次
+        executor.submit(_refresh_with_dialog, on_complete, key="refresh_dialog")
 
     def on_autostart_toggle(systray):
         enabled = not is_autostart_enabled()
@@ -368,7 +628,13 @@ def run_tray_app():
             pass  # _notify removed
 
     def on_show_wallpaper_info(systray):
-        threading.Thread(target=_show_wallpaper_info_dialog, daemon=True).start()
+        executor.submit(_show_wallpaper_info_dialog, key="info_dialog")
+
+    def on_history(systray):
+        def run():
+            _run_history_dialog()
+            _update_hover_text(systray_ref)
+        executor.submit(run, key="history_dialog")
 
     def on_open_commons(systray):
         info = get_current_wallpaper_info()
@@ -379,7 +645,10 @@ def run_tray_app():
         open_folder(WALLPAPER_DIR)
 
     def on_about(systray):
-        threading.Thread(target=_show_about_dialog, daemon=True).start()
+        executor.submit(_show_about_dialog, key="about_dialog")
+
+    def on_profile_update(systray):
+        executor.submit(_profile_update_and_show, key="profile_update")
 
     def _update_hover_text(systray_ref):
         s = systray_ref[0]
@@ -392,30 +661,159 @@ def run_tray_app():
         elif hasattr(s, "title"):
             s.title = title
 
+    def _analyze_catalog_quietly():
+        try:
+            _analyze_catalog()
+        except Exception:
+            pass
+
+    def _update_sprites_quietly():
+        from history import update_sprites
+        try:
+            update_sprites()
+        except Exception:
+            pass
+
+    def _compact_archive_quietly():
+        try:
+            _compact_archive()
+        except Exception:
+            pass
+
+    history_seen = None
+
+    def _history_changed() -> bool:
+        # 每次应用壁纸（含轮播切换）都会重写历史文件；只比较其修改时间，不读内容
+        nonlocal history_seen
+        try:
+            mtime = HISTORY_FILE.stat().st_mtime_ns
+        except OSError:
+            return False
+        if mtime == history_seen:
+            return False
+        history_seen = mtime
+        return True
+
+    def _quietly(fn, *args, **kwargs):
+        # 定时检查线程不能因单个任务出错（Pillow 解码、写文件权限等）而退出，否则此后不再同步、预取与午夜切换
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            return None
+
     def background_check():
         nonlocal last_date
+        schedule = _quietly(StaggerSchedule.from_config) or StaggerSchedule()
+        analyzed_on = None
+        compacted_on = None
         while True:
-            time.sleep(CHECK_INTERVAL)
-            now = datetime.now().date()
-            if now != last_date:
-                last_date = now
-            # 每次检查都尝试更新：已有今日壁纸则快速返回；开机时网络未就绪则重试直到成功
-            if update_wallpaper():
-                pass
+            # 唤醒时刻按本机偏移错峰，但跨天那一刻总会准时醒来
+            wake = schedule.next_wakeup(datetime.now(), CHECK_INTERVAL)
+            time.sleep(max(0.0, (wake - datetime.now()).total_seconds()))
+            now = datetime.now()
+            if now.date() != last_date:
+                last_date = now.date()
+                # 午夜只做本地切换：应用已预取/已缓存的今日壁纸，不访问网络
+                SCHEDULER_RUNS.inc(task="midnight")
+                _quietly(_update, local_only=True)
+            # 到达本机的同步时刻后才联网：已有今日壁纸则快速返回；网络未就绪则下次检查重试
+            if now >= schedule.sync_at(now.date()):
+                SCHEDULER_RUNS.inc(task="sync")
+                _quietly(_update)
+            if now >= schedule.prefetch_at(now.date()):
+                # 先补齐缩略图分析（增量、每天一次），次日的选图即可按主题筛选
+                if analyzed_on != now.date():
+                    SCHEDULER_RUNS.inc(task="analysis")
+                    _analyze_catalog_quietly()
+                    analyzed_on = now.date()
+                SCHEDULER_RUNS.inc(task="prefetch")
+                _quietly(_prefetch, 1)
+                if compacted_on != now.date():
+                    # 旧壁纸归档压缩：单核、低优先级，交给执行器，不阻塞定时检查
+                    SCHEDULER_RUNS.inc(task="archive")
+                    executor.submit(_compact_archive_quietly, key="compact_archive", priority=PRIORITY_BACKGROUND)
+                    compacted_on = now.date()
+            if not _use_worker_process() and _history_changed():
+                # 历史有变化时才为新应用的壁纸（含轮播图，其文件稍后会被删除）补上历史缩略图
+                executor.submit(_update_sprites_quietly, key="history_sprites", priority=PRIORITY_BACKGROUND)
+            _quietly(_update_hover_text, systray_ref)
+
+    def ipc_refresh(args: dict) -> dict:
+        force = bool(args.get("force"))
+
+        def run():
+            ok = _update(force_refresh=force)
             _update_hover_text(systray_ref)
+            return ok
+
+        # 只排队不等待：IPC 在单个 accept 线程上处理，阻塞会让其他启动的 ping 超时
+        executor.submit(run, key=f"ipc_refresh:{force}", priority=PRIORITY_BACKGROUND)
+        return {"ok": True, "accepted": True}
+
+    def ipc_prefetch(args: dict) -> dict:
+        days = int(args.get("days", 1))
+        executor.submit(_prefetch, days, key=f"ipc_prefetch:{days}", priority=PRIORITY_BACKGROUND)
+        return {"ok": True, "accepted": True}
+
+    def ipc_status(args: dict) -> dict:
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "version": __version__,
+            "wallpaper": get_current_wallpaper_info(),
+        }
+
+    def ipc_quit(args: dict) -> dict:
+        stop = quit_ref[0]
+        if stop is None:
+            return {"ok": False, "error": "tray not ready"}
+        executor.submit(stop, key="quit", priority=PRIORITY_CONTROL)
+        return {"ok": True}
+
+    ipc_server = IpcServer({
+        "ping": lambda args: {"ok": True, "pid": os.getpid(), "version": __version__},
+        "refresh": ipc_refresh,
+        "status": ipc_status,
+        "prefetch": ipc_prefetch,
+        "quit": ipc_quit,
+    })
+    ipc_server.start()
+
+    # 轮播（config.json 中 slideshow_minutes > 0）：每次轮换只应用池中已裁好的图片
+    slideshow = Slideshow.from_config(on_change=lambda: _update_hover_text(systray_ref), topup=_slideshow_topup)
+    if slideshow:
+        slideshow.start()
+
+    # 指标端点（config.json 中 metrics_port），默认只绑定本机
+    metrics_server = None
+    try:
+        metrics_port = int(load_config().get("metrics_port") or 0)
+    except (TypeError, ValueError):
+        metrics_port = 0
+    if metrics_port:
+        metrics_server = serve_metrics(metrics_port, load_config().get("metrics_bind") or "127.0.0.1")
+
+    def _shutdown_services():
+        if metrics_server:
+            metrics_server.shutdown()
+        if slideshow:
+            slideshow.stop()
+        ipc_server.stop()
+        executor.shutdown()
+        instance_lock.release()
 
     def on_quit(systray):
-        pass
+        _shutdown_services()
 
     hover_text = t("app_title")
     info = get_current_wallpaper_info()
     if info.get("title"):
         hover_text = (info["title"])[:64]
 
-    # 语言子菜单（infi.systray）：在独立线程中保存并弹提示框，避免确认无响应
+    # 语言子菜单（infi.systray）：在任务线程中保存并弹提示框，避免确认无响应
     def make_lang_action(code):
         def action(systray):
-            threading.Thread(target=_set_language_preference, args=(code,), daemon=True).start()
+            executor.submit(_set_language_preference, code, key=f"language:{code}")
         action.lang_code = code
         return action
 
@@ -432,6 +830,7 @@ def run_tray_app():
         (t("menu_change_wallpaper"), None, on_change_wallpaper),
         (t("menu_autostart"), None, on_autostart_toggle),
         (t("menu_wallpaper_info"), None, on_show_wallpaper_info),
+        (t("menu_history"), None, on_history),
         (t("menu_view_commons"), None, on_open_commons),
         (t("menu_open_cache_folder"), None, on_open_cache_folder),
         ("-", None, None),
@@ -439,6 +838,9 @@ def run_tray_app():
         ("-", None, None),
         (t("menu_language"), None, lang_menu_options),
     )
+    # 隐藏的调试菜单：config.json 中 "debug_menu": true 时显示
+    if _debug_menu_enabled():
+        menu_options += ((t("menu_profile_update"), None, on_profile_update),)
 
     # exe 优先 infi.systray（打包后更稳定）；脚本优先 pystray
     if sys.platform == "win32":
@@ -528,9 +930,8 @@ def run_tray_app():
                         default_menu_index=0,
                     )
                     systray_ref[0] = systray
-                    dt = threading.Thread(target=_dialog_worker, daemon=True)
-                    dt.start()
-                    update_wallpaper()
+                    quit_ref[0] = systray.shutdown
+                    _update()
                     _update_hover_text(systray_ref)
                     t2 = threading.Thread(target=background_check, daemon=True)
                     t2.start()
@@ -540,49 +941,50 @@ def run_tray_app():
                     pass
             else:
                 try:
-                    _run_tray_pystray(icon_path, hover_text, last_date, background_check, _update_hover_text)
+                    _run_tray_pystray(icon_path, hover_text, last_date, background_check, _update_hover_text,
+                                      executor, shared_ref=systray_ref, quit_ref=quit_ref)
+                    _shutdown_services()
                     return
                 except Exception:
                     pass
 
-    _run_tray_pystray(icon_path, hover_text, last_date, background_check, _update_hover_text)
+    try:
+        _run_tray_pystray(icon_path, hover_text, last_date, background_check, _update_hover_text,
+                          executor, shared_ref=systray_ref, quit_ref=quit_ref)
+    finally:
+        _shutdown_services()
 
 
-def _run_tray_pystray(icon_path: str, hover_text: str, last_date, background_check, _update_hover_text):
+def _run_tray_pystray(icon_path: str, hover_text: str, last_date, background_check, _update_hover_text,
+                      executor: TaskExecutor, shared_ref=None, quit_ref=None):
     t = _load_i18n()
     import pystray
     from PIL import Image
 
     icon = None
     systray_ref = [None]
-    dialog_queue = queue.Queue()
     downloading_state = [False]
 
-    def _dialog_worker():
-        while True:
-            try:
-                dialog_queue.get(timeout=1.0)
-            except queue.Empty:
-                continue
-            downloading_state[0] = True
-            if icon:
-                icon.title = t("menu_downloading")
-
-            def _on_complete(ok):
-                downloading_state[0] = False
-                if ok:
-                    if icon:
-                        icon.title = t("app_title")
-                        icon.notify(t("progress_done"), t("app_name"))
-                    _update_hover_text(systray_ref)
-                else:
-                    if icon:
-                        icon.title = t("app_title")
+    def _refresh_with_dialog():
+        downloading_state[0] = True
+        if icon:
+            icon.title = t("menu_downloading")
 
-            _run_progress_dialog(_on_complete)
+        def _on_complete(ok):
+            downloading_state[0] = False
+            if ok:
+                if icon:
+                    icon.title = t("app_title")
+                    icon.notify(t("progress_done"), t("app_name"))
+                _update_hover_text(systray_ref)
+            else:
+                if icon:
+                    icon.title = t("app_title")
+
+        _run_refresh_dialog(_on_complete)
 
     def on_change_wallpaper(_, __):
-        dialog_queue.put(None)
+        executor.submit(_refresh_with_dialog, key="refresh_dialog")
 
     autostart_state = [is_autostart_enabled()]
 
@@ -595,7 +997,13 @@ def _run_tray_pystray(icon_path: str, hover_text: str, last_date, background_che
                 icon.update_menu()
 
     def on_show_info(_, __):
-        threading.Thread(target=_show_wallpaper_info_dialog, daemon=True).start()
+        executor.submit(_show_wallpaper_info_dialog, key="info_dialog")
+
+    def on_history(_, __):
+        def run():
+            _run_history_dialog()
+            _update_hover_text(systray_ref)
+        executor.submit(run, key="history_dialog")
 
     def on_open_commons(_, __):
         info = get_current_wallpaper_info()
@@ -607,19 +1015,18 @@ def _run_tray_pystray(icon_path: str, hover_text: str, last_date, background_che
 
     def on_about_pystray(_, __):
         # 让托盘菜单回调先返回，避免在 pystray 的消息处理线程中同步弹出模态框
-        threading.Thread(
-            target=_show_about_dialog,
-            name="AboutDialogThread",
-            daemon=True,
-        ).start()
+        executor.submit(_show_about_dialog, key="about_dialog")
 
     def setup(icon_obj):
         nonlocal icon
         icon = icon_obj
         systray_ref[0] = icon
+        if shared_ref is not None:
+            shared_ref[0] = icon
+        if quit_ref is not None:
+            quit_ref[0] = icon.stop
         icon.visible = True
-        threading.Thread(target=_dialog_worker, daemon=True).start()
-        update_wallpaper()
+        _update()
         _update_hover_text(systray_ref)
         threading.Thread(target=background_check, daemon=True).start()
         # Win11 图标常在折叠区，启动时提示用户
@@ -638,13 +1045,9 @@ def _run_tray_pystray(icon_path: str, hover_text: str, last_date, background_che
         items = []
 
         def make_action(c):
-            # 在独立线程中执行语言保存与消息框，避免阻塞 pystray 菜单回调线程
+            # 在任务线程中执行语言保存与消息框，避免阻塞 pystray 菜单回调线程
             def action(icon, item):
-                threading.Thread(
-                    target=_set_language_preference,
-                    args=(c,),
-                    daemon=True,
-                ).start()
+                executor.submit(_set_language_preference, c, key=f"language:{c}")
 
             return action
 
@@ -667,12 +1070,17 @@ def _run_tray_pystray(icon_path: str, hover_text: str, last_date, background_che
         pystray.MenuItem(menu_text, on_change_wallpaper, default=True),
         pystray.MenuItem(t("menu_autostart"), on_autostart_toggle, checked=lambda _: autostart_state[0]),
         pystray.MenuItem(t("menu_wallpaper_info"), on_show_info),
+        pystray.MenuItem(t("menu_history"), on_history),
         pystray.MenuItem(t("menu_view_commons"), on_open_commons),
         pystray.MenuItem(t("menu_open_cache_folder"), on_open_cache_folder),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem(t("menu_about"), on_about_pystray),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem(t("menu_language"), _language_menu()),
+        # 隐藏的调试菜单：config.json 中 "debug_menu": true 时显示
+        pystray.MenuItem(t("menu_profile_update"),
+                         lambda _, __: executor.submit(_profile_update_and_show, key="profile_update"),
+                         visible=lambda _: _debug_menu_enabled()),
         pystray.MenuItem(t("menu_quit"), lambda _, __: icon.stop()),
     )
     # 始终用内存图标，避免中文路径等导致 Win11 托盘不显示
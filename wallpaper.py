@@ -3,19 +3,11 @@
 Daily Commons Wallpaper - Bing-style daily wallpaper from Wikimedia Commons.
 """
 
+import json
 import random
 import sys
 
-from config import WALLPAPER_DIR
-from core import (
-    ensure_dir,
-    fetch_images_from_commons,
-    get_file_extension,
-    download_image,
-    set_wallpaper,
-    update_wallpaper,
-)
-from tray import run_tray_app
+from config import PEER_PORT, SNAPSHOT_DAYS, WALLPAPER_DIR
 
 
 def main():
@@ -25,11 +17,86 @@ def main():
     parser.add_argument("--once", action="store_true", help="Run once and exit")
     parser.add_argument("-r", "--random", action="store_true", help="Random selection (with --once)")
     parser.add_argument("-n", "--count", type=int, default=200, help="Image count to fetch")
+    parser.add_argument("--profile", action="store_true",
+                        help="With --once: profile a full update (cProfile + tracemalloc) into profiles/")
+    parser.add_argument("--status", action="store_true",
+                        help="Print the applied wallpaper, last sync, cache size and failures (no network)")
+    parser.add_argument("--json", action="store_true", help="With --status: print JSON")
+    parser.add_argument("--send", choices=("refresh", "status", "prefetch", "quit"),
+                        help="Send a command to the running tray and exit")
+    parser.add_argument("--serve-cache", action="store_true", help="Serve catalog and images to LAN peers")
+    parser.add_argument("--bind", default="0.0.0.0", help="Address for --serve-cache")
+    parser.add_argument("--port", type=int, default=PEER_PORT, help="Port for --serve-cache")
+    parser.add_argument("--export-snapshot", metavar="FILE",
+                        help="Bundle catalog, analysis cache and the next days' wallpapers into FILE")
+    parser.add_argument("--days", type=int, default=SNAPSHOT_DAYS, help="Days to include with --export-snapshot")
+    parser.add_argument("--import-snapshot", metavar="FILE", help="Seed this install from a snapshot (no network)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-args", default="", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    # 快速路径：只读本地文件，不导入 core / 网络 / GUI 模块
+    if args.status:
+        from status import collect_status, format_status
+        status = collect_status()
+        print(json.dumps(status, ensure_ascii=False, indent=2) if args.json else format_status(status))
+        sys.exit(0 if status["healthy"] else 1)
+
+    # 托盘启动的短命 worker 进程：执行完一项任务即退出，不参与单实例转交
+    if args.worker:
+        from worker import worker_main
+        sys.exit(worker_main(args.worker, args.worker_args))
+
+    if args.export_snapshot or args.import_snapshot:
+        from snapshot import export_snapshot, import_snapshot
+        try:
+            if args.export_snapshot:
+                manifest = export_snapshot(args.export_snapshot, days=args.days)
+                result = {"ok": True, "days": len(manifest["prefetch"]), "files": len(manifest["files"])}
+            else:
+                result = dict(import_snapshot(args.import_snapshot), ok=True)
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        sys.exit(0 if result["ok"] else 1)
+
+    if args.serve_cache:
+        from peer import serve_cache
+        serve_cache(args.bind, args.port)
+        return
+
+    from ipc import send_command
+
+    # 托盘已在运行时把命令转交给它，避免冷启动第二个进程
+    if args.send:
+        reply = send_command(args.send, {"force": True} if args.send == "refresh" else None)
+        if reply is None:
+            print("Daily Commons Wallpaper is not running", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(reply, ensure_ascii=False, indent=2))
+        sys.exit(0 if reply.get("ok") else 1)
+
+    tray_mode = not args.once and (args.tray or (len(sys.argv) == 1 and sys.platform == "win32"))
+    if not args.random and not args.profile:
+        handoff = ("ping", None) if tray_mode else ("refresh", {"force": False})
+        if send_command(*handoff) is not None:
+            return
+
+    from core import (
+        ensure_dir,
+        fetch_images_from_commons,
+        get_file_extension,
+        download_image,
+        set_wallpaper,
+    )
+    from coordinator import coordinated_update
+
     if args.once:
         ensure_dir()
-        if args.random:
+        if args.profile:
+            from profiler import profile_update
+            print(profile_update())
+        elif args.random:
             images = fetch_images_from_commons(limit=args.count)
             if images:
                 selected = random.choice(images)
@@ -38,15 +105,21 @@ def main():
                 if download_image(selected["url"], filepath):
                     set_wallpaper(filepath)
         else:
-            update_wallpaper()
+            coordinated_update()
         return
 
-    if args.tray or (len(sys.argv) == 1 and sys.platform == "win32"):
+    if tray_mode:
+        from tray import run_tray_app
         run_tray_app()
     else:
         ensure_dir()
-        update_wallpaper()
+        coordinated_update()
 
 
 if __name__ == "__main__":
+    # 归档压缩使用进程池；打包版的子进程需要 freeze_support 才不会重新启动整个程序
+    # （只在打包版中导入 multiprocessing，--status 等快速路径不为此多花启动时间）
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
     main()
@@ -0,0 +1,260 @@
+"""Worker process - run update work in a short-lived subprocess.
+
+With "worker_process": true in config.json the resident tray keeps only the
+icon and scheduler: fetch, download, decode, apply and the progress dialog run
+in `wallpaper.py --worker TASK`, which exits afterwards and frees catalogs,
+PIL, tkinter and TLS state. Progress comes back as JSON lines on the worker's
+stdout; a "cancel" line on its stdin cancels it.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+from dataclasses import asdict
+from pathlib import Path
+
+from metrics import merge as merge_metrics
+from progress import ProgressEvent
+
+TASKS = ("update", "prefetch", "analyze", "archive", "slideshow_topup", "dialog", "history")
+_CANCEL_GRACE = 10.0  # 发送 cancel 后仍未退出则强制结束（秒）
+
+_inflight_lock = threading.Lock()
+_inflight = {}
+
+
+def _worker_command(task: str, args: dict) -> list[str]:
+    if getattr(sys, "frozen", False):
+        cmd = [sys.executable]
+    else:
+        cmd = [sys.executable, str(Path(__file__).resolve().with_name("wallpaper.py"))]
+    return cmd + ["--worker", task, "--worker-args", json.dumps(args)]
+
+
+class _Run:
+    def __init__(self):
+        self.result = False
+        self.done = threading.Event()
+        self.listeners = []
+
+
+def run_task(task: str, args: dict = None, on_event=None, cancel_token=None) -> bool:
+    """Run task in a worker process and return its result.
+
+    相同任务与参数的并发请求共享同一个 worker；on_event 收到 worker 转发的 ProgressEvent。
+    """
+    args = args or {}
+    key = (task, json.dumps(args, sort_keys=True))
+    with _inflight_lock:
+        run = _inflight.get(key)
+        leader = run is None
+        if leader:
+            run = _inflight[key] = _Run()
+        if on_event:
+            run.listeners.append(on_event)
+    if not leader:
+        unregister = cancel_token.on_cancel(run.done.set) if cancel_token else None
+        try:
+            run.done.wait()
+        finally:
+            if unregister:
+                unregister()
+        return run.result
+    try:
+        run.result = _run_process(task, args, run, cancel_token)
+    except OSError:
+        run.result = False
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        run.done.set()
+    return run.result
+
+
+def update_result_without_worker(local_only: bool = False) -> bool | None:
+    """Result of an automatic update known from local JSON alone, or None when a worker has work to do.
+
+    定时检查每分钟都会触发；今日壁纸已应用（无待替换的预览图、显示器布局未变）时不必冷启动 worker。
+    """
+    from core import _get_prefetched, _is_cache_from_today, _layout_matches, get_date_id
+    from display import get_monitors
+
+    is_today, cache = _is_cache_from_today()
+    if is_today and not cache.get("preview") and (not cache.get("span") or _layout_matches(cache, get_monitors())):
+        return True
+    if local_only and not _get_prefetched(get_date_id()):
+        # 午夜本地切换没有预取文件可用：worker 也只会返回 False
+        return False
+    return None
+
+
+def prefetch_result_without_worker(days_ahead: int = 1) -> bool | None:
+    """True when that day is already prefetched for this monitor layout, else None."""
+    from core import _date_id_for, _get_prefetched, _layout_matches
+    from display import get_monitors
+
+    entry = _get_prefetched(_date_id_for(days_ahead))
+    return True if entry and _layout_matches(entry, get_monitors()) else None
+
+
+def _send_cancel(proc: subprocess.Popen):
+    try:
+        proc.stdin.write(b"cancel\n")
+        proc.stdin.flush()
+    except (OSError, ValueError):
+        pass
+
+    def kill_if_stuck():
+        if proc.poll() is None:
+            proc.terminate()
+
+    timer = threading.Timer(_CANCEL_GRACE, kill_if_stuck)
+    timer.daemon = True
+    timer.start()
+
+
+def _merge_metrics(line: bytes):
+    try:
+        msg = json.loads(line)
+    except ValueError:
+        return
+    if isinstance(msg, dict) and isinstance(msg.get("metrics"), dict):
+        merge_metrics(msg["metrics"])
+
+
+def _reap(proc: subprocess.Popen):
+    # 结果已收到；worker 可能还在后台替换原图。读完其余输出（退出前的指标），等它自行退出
+    try:
+        proc.stdin.close()
+    except OSError:
+        pass
+    try:
+        for line in proc.stdout:
+            _merge_metrics(line)
+        proc.stdout.close()
+    except (OSError, ValueError):
+        pass
+    proc.wait()
+
+
+def _run_process(task: str, args: dict, run: _Run, cancel_token) -> bool:
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    proc = subprocess.Popen(
+        _worker_command(task, args),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        creationflags=creationflags,
+    )
+    unregister = cancel_token.on_cancel(lambda: _send_cancel(proc)) if cancel_token else None
+    result = False
+    try:
+        # 逐行阻塞读取，worker 退出时 stdout 关闭，循环随之结束
+        for line in proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if "event" in msg:
+                event = ProgressEvent(**msg["event"])
+                for fn in list(run.listeners):
+                    try:
+                        fn(event)
+                    except Exception:
+                        pass
+            elif "result" in msg:
+                result = bool(msg["result"])
+                break
+    finally:
+        if unregister:
+            unregister()
+        threading.Thread(target=_reap, args=(proc,), name="WorkerReapThread", daemon=True).start()
+    return result
+
+
+def worker_main(task: str, args_json: str = "") -> int:
+    """Entry point inside the worker process (wallpaper.py --worker)."""
+    from core import CancelToken, wait_for_pending_swaps
+    from metrics import export as export_metrics
+
+    args = json.loads(args_json or "{}")
+    out_lock = threading.Lock()
+    finished = threading.Event()
+    cancel_token = CancelToken()
+
+    def emit(msg: dict):
+        with out_lock:
+            try:
+                sys.stdout.write(json.dumps(msg, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+
+    def watch_stdin():
+        for line in sys.stdin:
+            if line.strip() == "cancel":
+                cancel_token.cancel()
+        # 父进程在结果返回前消失（stdin 关闭）：取消本次任务
+        if not finished.is_set():
+            cancel_token.cancel()
+
+    if sys.stdin is not None:
+        threading.Thread(target=watch_stdin, name="WorkerStdinThread", daemon=True).start()
+
+    def on_event(event: ProgressEvent):
+        emit({"event": asdict(event)})
+
+    try:
+        ok = _run_task_here(task, args, cancel_token, on_event)
+    except Exception:
+        ok = False
+    finished.set()
+    emit({"result": ok})
+    wait_for_pending_swaps()
+    # 指标在 worker 内记录，退出前交给托盘合并，/metrics 才能看到下载、API 与应用的数据
+    emit({"metrics": export_metrics()})
+    return 0 if ok else 1
+
+
+def _run_task_here(task: str, args: dict, cancel_token, on_event) -> bool:
+    from coordinator import coordinated_prefetch, coordinated_update
+
+    if task == "update":
+        return coordinated_update(
+            force_refresh=bool(args.get("force_refresh")),
+            cancel_token=cancel_token,
+            on_event=on_event,
+            local_only=bool(args.get("local_only")),
+        )
+    if task == "prefetch":
+        return coordinated_prefetch(int(args.get("days_ahead", 1)), cancel_token=cancel_token)
+    if task == "analyze":
+        from analysis import analyze_catalog
+        from core import get_catalog
+
+        analyze_catalog(get_catalog(cancel_token=cancel_token), cancel_token=cancel_token)
+        return True
+    if task == "archive":
+        from archive import compact_archive
+
+        compact_archive(cancel_token=cancel_token)
+        return True
+    if task == "slideshow_topup":
+        from config import SLIDESHOW_POOL_SIZE
+        from slideshow import _lower_thread_priority, topup_pool
+
+        _lower_thread_priority()
+        return topup_pool(int(args.get("pool_size", SLIDESHOW_POOL_SIZE)), cancel_token)
+    if task == "dialog":
+        from tray import _run_progress_dialog
+
+        result = []
+        _run_progress_dialog(result.append)
+        return bool(result and result[0])
+    if task == "history":
+        from tray import _show_history_dialog
+
+        _show_history_dialog()
+        return True
+    return False